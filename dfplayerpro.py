@@ -1,69 +1,111 @@
-from time import ticks_ms, ticks_diff, sleep
 from machine import UART
-
-
-class DFPlayerPro:
-    RESPONSE_TIMEOUT_MS = 1000  # Timeout for waiting for a response
-    LOG_LEVEL = (
-        "INFO"  # Default log level: "NONE", "ERROR", "WARN", "INFO", "DEBUG"
-    )
-
-    def __init__(self, uart_instance, tx_pin, rx_pin, log_level="INFO"):
+from dfplayercore import DFPlayerCore
+from logger import Logger, DEBUG, INFO, WARN
+import atcommand
+import responseparser
+
+
+class DFPlayerPro(DFPlayerCore):
+    def __init__(
+        self,
+        uart_instance,
+        tx_pin,
+        rx_pin,
+        log_level="INFO",
+        cache=False,
+        uart=None,
+        metrics=None,
+        logger=None,
+    ):
         """
         Initialize the DFPlayerPro instance.
 
         :param uart_instance: UART instance number.
         :param tx_pin: TX pin number.
         :param rx_pin: RX pin number.
-        :param log_level: Log level as a string ("NONE", "ERROR", "WARN", "INFO", "DEBUG").
+        :param log_level: Log level of the driver's own logger, as a name ("NONE", "ERROR", "WARN", "INFO", "DEBUG") or a logger level.
+        :param cache: If True, skip volume and prompt tone writes that would not
+            change the last confirmed setting. Call resync() to refresh.
+        :param uart: An already configured UART (or UART-like object, such as
+            the host emulator) to use instead of creating one.
+        :param metrics: A CommandMetrics instance to record latency, timeout
+            and error counts for every command in, or None.
+        :param logger: A Logger to share, e.g. with the application. Without
+            one, the driver keeps its own at ``log_level``.
+        """
+        if uart is None:
+            uart = UART(
+                uart_instance,
+                baudrate=self.UART_BAUD_RATE,
+                tx=tx_pin,
+                rx=rx_pin,
+            )
+        super().__init__(
+            uart,
+            cache,
+            metrics,
+            logger if logger is not None else Logger(log_level),
+        )
+
+    def send_command(self, command):
         """
-        self.uart = UART(uart_instance, baudrate=115200, tx=tx_pin, rx=rx_pin)
-        self.LOG_LEVEL = log_level  # Set the log level
+        Send a command to the DFPlayer and wait for a response.
 
-    def _log(self, level, message):
+        :param command: The command to send as bytes (or a memoryview),
+            including the CRLF terminator.
+        :return: The response line from the DFPlayer as a memoryview (valid
+            until the next command), or None if no response is received.
+            Inside a batch() block the command is queued and None is returned.
         """
-        Internal logging function for the DFPlayerPro class.
+        return self._transmit(command, b"RAW")
 
-        :param level: Log level as a string ("NONE", "ERROR", "WARN", "INFO", "DEBUG").
-        :param message: The message to log.
+    def _command(self, prefix, argument=None):
         """
-        levels = {"NONE": -1, "ERROR": 0, "WARN": 1, "INFO": 2, "DEBUG": 3}
-        if levels[level] <= levels[self.LOG_LEVEL]:
-            print(f"[{level}] {message}")
+        Encode a command from the prefix table and send it.
 
-    def send_command(self, command):
+        :param prefix: The command prefix, e.g. atcommand.VOL.
+        :param argument: The command argument (int, str or bytes), if any.
+        :return: The response, as for send_command.
         """
-        Send a command to the DFPlayer and wait for a response.
+        return self._transmit(self.encoder.encode(prefix, argument), prefix)
 
-        :param command: The command to send as bytes.
-        :return: The response from the DFPlayer, or None if no response is received.
+    def wait_for_response(self, key=None, timeout_ms=None):
+        """
+        Wait for a response from the DFPlayer within the timeout period.
+
+        Returns as soon as the CRLF terminator of the reply arrives. Lines that
+        cannot be the reply are passed to the router's subscribers.
+
+        :param key: The prefix of the command sent, or None to accept any line.
+        :param timeout_ms: How long to wait, default RESPONSE_TIMEOUT_MS.
+        :return: The full response as a memoryview, or None if no response is received.
         """
-        self.uart.write(command)
-        self._log("DEBUG", f"Command sent: {command}")
-        response = self.wait_for_response()  # Wait for and return the response
-        sleep(0.1)  # Small delay to allow for processing
+        if timeout_ms is None:
+            timeout_ms = self.RESPONSE_TIMEOUT_MS
+        response = self.router.wait_reply(key, timeout_ms)
+        if response is None:
+            self.logger.log(DEBUG, "No complete response within timeout")
         return response
 
-    def wait_for_response(self):
+    def resync(self):
         """
-        Wait for a response from the DFPlayer within the timeout period.
+        Refresh the state cache from the device.
 
-        :return: The full response as bytes, or None if no response is received.
-        """
-        start_time = ticks_ms()
-        response = b""  # Initialize an empty response buffer
-        while ticks_diff(ticks_ms(), start_time) < self.RESPONSE_TIMEOUT_MS:
-            chunk = self.uart.read()  # Read a chunk of data from UART
-            if chunk:
-                response += chunk  # Append the chunk to the response buffer
-                self._log("DEBUG", f"Received chunk: {chunk}")
-                if response.endswith(
-                    b"\r\n"
-                ):  # Check if the response is complete
-                    self._log("DEBUG", f"Full response: {response}")
-                    return response
-        self._log("DEBUG", "No complete response received within timeout")
-        return None  # Return None if no complete response is received
+        The volume is queried; the prompt tone cannot be read back, so it is
+        forgotten and the next write of it is sent.
+        """
+        if self.state is None:
+            return
+        self.state.clear()
+        try:
+            self.state.volume = responseparser.parse_volume(
+                self._command(atcommand.VOL_QUERY)
+            )
+        except responseparser.ResponseError as e:
+            self.logger.log(WARN, "Invalid response for resync: %s", e.reason)
+        self.logger.log(
+            DEBUG, "State cache resynced, volume=%s", self.state.volume
+        )
 
     def play_specific_file(self, file_path):
         """
@@ -72,8 +114,7 @@ class DFPlayerPro:
         :param file_path: The file path to play as a string.
         :return: The response from the DFPlayer, or None if the command was not sent.
         """
-        command = f"AT+PLAYFILE={file_path}\r\n".encode()
-        return self.send_command(command)
+        return self._command(atcommand.PLAYFILE, file_path)
 
     def set_volume(self, volume):
         """
@@ -82,8 +123,7 @@ class DFPlayerPro:
         :param volume: The volume level (0-30).
         :return: The response from the DFPlayer, or None if the command was not sent.
         """
-        command = f"AT+VOL={volume}\r\n".encode()
-        return self.send_command(command)
+        return self._apply_setting("volume", volume, atcommand.VOL)
 
     def test_connection(self):
         """
@@ -91,7 +131,7 @@ class DFPlayerPro:
 
         :return: The response from the DFPlayer, or None if no response is received.
         """
-        return self.send_command(b"AT\r\n")
+        return self._command(atcommand.AT)
 
     def set_prompt_tone(self, state):
         """
@@ -100,8 +140,7 @@ class DFPlayerPro:
         :param state: "ON" or "OFF".
         :return: The response from the DFPlayer, or None if the command was not sent.
         """
-        command = f"AT+PROMPT={state}\r\n".encode()
-        return self.send_command(command)
+        return self._apply_setting("prompt_tone", state, atcommand.PROMPT)
 
     def query_file_name(self):
         """
@@ -109,24 +148,31 @@ class DFPlayerPro:
 
         :return: The file name as a decoded string, or None if the command was not sent or the response is invalid.
         """
-        response = self.send_command(b"AT+QUERY=5\r\n")  # Query file name
-        if response and b"\r\n" in response:  # Validate the response format
-            try:
-                decoded_name = response.strip().decode(
-                    "utf-16", errors="ignore"
-                )
-                self._log("INFO", f"Queried file name: {decoded_name}")
-                return decoded_name
-            except Exception as e:
-                self._log(
-                    "WARN",
-                    f"Failed to decode file name: {response}, Error: {e}",
-                )
-        else:
-            self._log(
-                "WARN", f"Invalid response for query_file_name: {response}"
+        response = self._command(atcommand.QUERY_FILE_NAME)  # Query file name
+        try:
+            decoded_name = responseparser.parse_file_name(response)
+        except responseparser.ResponseError as e:
+            self.logger.log(
+                WARN, "Invalid response for query_file_name: %s", e.reason
+            )
+            return None
+        self.logger.log(INFO, "Queried file name: %s", decoded_name)
+        return decoded_name
+
+    def query_total_time(self):
+        """
+        Query the total time of the current track.
+
+        :return: The total time in seconds, or None if the command was not sent or the response is invalid.
+        """
+        response = self._command(atcommand.QUERY_TOTAL_TIME)
+        try:
+            return responseparser.parse_seconds(response)
+        except responseparser.ResponseError as e:
+            self.logger.log(
+                WARN, "Invalid response for query_total_time: %s", e.reason
             )
-        return None
+            return None
 
     def play_next(self):
         """
@@ -134,7 +180,7 @@ class DFPlayerPro:
 
         :return: The response from the DFPlayer, or None if the command was not sent.
         """
-        return self.send_command(b"AT+PLAY=NEXT\r\n")
+        return self._command(atcommand.PLAY_NEXT)
 
     def play_previous(self):
         """
@@ -142,4 +188,4 @@ class DFPlayerPro:
 
         :return: The response from the DFPlayer, or None if the command was not sent.
         """
-        return self.send_command(b"AT+PLAY=LAST\r\n")
+        return self._command(atcommand.PLAY_LAST)
@@ -0,0 +1,34 @@
+import uasyncio as asyncio
+from machine import Pin
+from dfplayerpro_async import AsyncDFPlayerPro
+
+# Constants. Change these if DFPlayer is connected to other pins.
+UART_INSTANCE = 1
+TX_PIN = 7
+RX_PIN = 6
+LED_PIN = 8
+
+
+async def blink(led):
+    # Keeps blinking while the player is busy talking to the DFPlayer
+    while True:
+        led.value(not led.value())
+        await asyncio.sleep_ms(100)
+
+
+async def main():
+    player = AsyncDFPlayerPro(UART_INSTANCE, TX_PIN, RX_PIN)
+    asyncio.create_task(blink(Pin(LED_PIN, Pin.OUT)))
+
+    response = await player.set_volume(5)
+    print("Volume set, Response:", response)
+
+    response = await player.play_specific_file("/01/004.mp3")
+    print("Playing file, Response:", response)
+
+    print("File name:", await player.query_file_name())
+    await asyncio.sleep(5)
+    print("Finished")
+
+
+asyncio.run(main())
@@ -9,20 +9,26 @@ RX_PIN = 6
 # Create player instance
 player = DFPlayerPro(UART_INSTANCE, TX_PIN, RX_PIN)
 
+
+def show(response):
+    # Replies are memoryviews, only valid until the next command
+    return bytes(response) if response is not None else "No reply"
+
+
 # Test connection
 # response = player.test_connection()
-# print('Connection Test:', response)
+# print('Connection Test:', show(response))
 
 # Set volume to a medium level
 volume_level = 5
 response = player.set_volume(volume_level)
-print(f"Volume set to {volume_level}, Response:", response)
+print(f"Volume set to {volume_level}, Response:", show(response))
 
 # Set the filename to play
 filename = "/01/004.mp3"
 
 # Play the specific file
 response = player.play_specific_file(filename)
-print(f"Playing file {filename}, Response:", response)
+print(f"Playing file {filename}, Response:", show(response))
 
 print("Finished")
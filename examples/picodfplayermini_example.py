@@ -47,6 +47,15 @@ sleep(5)
 
 #Pause by directly sending the pause  (0x0E) command to the command line and printing the output.
 print('Pausing by sending the pause command manually, and printing the output')
-print(str(player.sendcmd(0x0E, 0x00, 0x00)))
+response = player.sendcmd(0x0E, 0x00, 0x00)
+print(bytes(response) if response is not None else 'No reply')
+
+#Query the volume (0x43); query() returns the value from the module's data frame
+print('Volume:', player.query(0x43))
+
+#Play a track and wait on the BUSY pin until it has finished, instead of guessing its length
+print('Playing track 002.mp3 in folder 01 to the end')
+finished = player.playTrackAndWait(1, 2)
+print('Finished' if finished is not None else 'Did not finish in time')
 
 print('You can try me out by sending commands in the console, such as player.resume()')
\ No newline at end of file
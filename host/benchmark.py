@@ -0,0 +1,386 @@
+# Description: Benchmark suite for the DFPlayer Pro drivers, run against the
+# host emulator. Reports commands per second, round-trip latency percentiles
+# per command type, bytes allocated per command and simulated
+# button-press-to-OK latency and PlayerGroup fan-out time, and writes the
+# results as JSON so driver versions can be compared.
+# License: MIT
+#
+# Usage: python host/benchmark.py [--iterations N] [--jitter MS] [--output FILE]
+
+import argparse
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import micropython_shim  # noqa: E402
+
+micropython_shim.install()
+
+from dfplayer_emulator import DFPlayerProEmulator  # noqa: E402
+from responseparser import ResponseError, TIMEOUT  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OK = b"OK\r\n"
+
+# (label, method name, arguments, reply) for each command type measured. The
+# reply is what the allocation measurement's canned UART answers with.
+COMMANDS = (
+    ("AT", "test_connection", (), OK),
+    ("VOL=n", "set_volume", (8,), OK),
+    ("VOL=?", "query_volume", (), b"VOL=[8]\r\n"),
+    ("PLAYMODE=n", "set_play_mode", (1,), OK),
+    ("PLAYFILE", "play_specific_file", ("/01/ESPRESSO.MP3",), OK),
+    ("PLAYNUM", "play_file_number", (2,), OK),
+    ("PLAY=NEXT", "next_track", (), OK),
+    ("PLAY=NEXT", "play_next", (), OK),
+    ("PROMPT", "set_prompt_tone", ("OFF",), OK),
+    ("QUERY=1", "query_current_track", (), b"2\r\n"),
+    ("QUERY=3", "query_played_time", (), b"12\r\n"),
+    ("QUERY=4", "query_total_time", (), b"25\r\n"),
+    (
+        "QUERY=5",
+        "query_file_name",
+        (),
+        "ESPRESSO.MP3".encode("utf-16-le") + b"\r\n",
+    ),
+)
+
+
+def load_drivers():
+    """
+    Import both DFPlayerPro drivers under distinct names.
+
+    :return: Dict of driver name to DFPlayerPro class.
+    """
+    drivers = {}
+    for name, path in (
+        ("lib", os.path.join(REPO_DIR, "lib", "dfplayerpro_full.py")),
+        ("root", os.path.join(REPO_DIR, "dfplayerpro.py")),
+    ):
+        spec = importlib.util.spec_from_file_location(
+            "dfplayerpro_" + name, path
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        drivers[name] = module.DFPlayerPro
+    return drivers
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = int(round(fraction * (len(ordered) - 1)))
+    return ordered[min(len(ordered) - 1, index)]
+
+
+def summarize(latencies_us):
+    return {
+        "count": len(latencies_us),
+        "p50_us": percentile(latencies_us, 0.50),
+        "p95_us": percentile(latencies_us, 0.95),
+        "p99_us": percentile(latencies_us, 0.99),
+        "max_us": max(latencies_us),
+    }
+
+
+class CannedUART:
+    """
+    A UART stand-in that answers every write with the same preallocated reply.
+
+    It allocates nothing itself, so allocations measured around a command are
+    the driver's own.
+    """
+
+    def __init__(self, reply):
+        self.reply = memoryview(bytes(reply))
+        self.waiting = 0
+
+    def write(self, buf):
+        self.waiting += len(self.reply)
+        return len(buf)
+
+    def any(self):
+        return self.waiting
+
+    def readinto(self, buf, nbytes=None):
+        if not self.waiting:
+            return None
+        count = len(self.reply)
+        buf[:count] = self.reply
+        self.waiting -= count
+        return count
+
+
+def new_player(driver, uart):
+    """
+    :return: A driver instance on ``uart``, with logging off if it logs.
+    """
+    if "log_level" in inspect.signature(driver).parameters:
+        return driver(1, 7, 6, uart=uart, log_level="NONE")
+    return driver(1, 7, 6, uart=uart)
+
+
+def make_player(driver, jitter_ms, seed):
+    emulator = DFPlayerProEmulator(jitter_ms=jitter_ms, seed=seed)
+    return new_player(driver, emulator), emulator
+
+
+def measure_allocations(driver, method, args, reply, repeats=20):
+    """
+    :return: Average bytes allocated (peak, traced) per call.
+    """
+    player = new_player(driver, CannedUART(reply))
+    call = getattr(player, method)
+    call(*args)  # Warm up any lazily created state
+    tracemalloc.start()
+    total = 0
+    for _ in range(repeats):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call(*args)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / repeats
+
+
+def bench_commands(driver, iterations, jitter_ms):
+    """
+    Time each command type and measure its allocations.
+
+    :return: Dict of per-command results plus the overall command rate.
+    """
+    player, _ = make_player(driver, jitter_ms, seed=1)
+    results = {}
+    total_commands = 0
+    total_time = 0.0
+    for label, method, args, reply in COMMANDS:
+        if not hasattr(player, method):
+            continue
+        call = getattr(player, method)
+        latencies = []
+        timeouts = 0
+        errors = 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            try:
+                response = call(*args)
+            except ResponseError as error:
+                # The full driver's queries raise instead of returning None
+                response = error
+            elapsed = time.perf_counter() - start
+            latencies.append(int(elapsed * 1000000))
+            total_time += elapsed
+            if response is None:
+                timeouts += 1
+            elif isinstance(response, ResponseError):
+                if response.reason == TIMEOUT:
+                    timeouts += 1
+                else:
+                    errors += 1
+        total_commands += iterations
+        entry = summarize(latencies)
+        entry["timeouts"] = timeouts
+        entry["errors"] = errors
+        entry["alloc_bytes_per_command"] = measure_allocations(
+            driver, method, args, reply
+        )
+        results[label] = entry
+    return {
+        "commands_per_second": (
+            total_commands / total_time if total_time else 0
+        ),
+        "commands": results,
+    }
+
+
+class ReplyClock:
+    """
+    Wrap a player's UART to note when the first OK reply is read after a mark.
+    """
+
+    def __init__(self, uart):
+        self.uart = uart
+        self.ok_time = None
+
+    def mark(self):
+        self.ok_time = None
+
+    def __getattr__(self, name):
+        return getattr(self.uart, name)
+
+    def readinto(self, buf, nbytes=None):
+        count = self.uart.readinto(buf, nbytes)
+        if count and self.ok_time is None and b"OK" in bytes(buf[:count]):
+            self.ok_time = time.perf_counter()
+        return count
+
+
+def bench_frother_press(driver, iterations, jitter_ms):
+    """
+    Button press to OK for the main.py frother/espresso path: cancel the fade,
+    then play the file and restore the volume in one batch.
+    """
+    from fader import VolumeFader
+
+    player, emulator = make_player(driver, jitter_ms, seed=2)
+    clock = ReplyClock(emulator)
+    player.uart = player.reader.uart = clock
+    fader = VolumeFader(player)
+    latencies = []
+    for i in range(iterations):
+        clock.mark()
+        start = time.perf_counter()
+        fader.cancel()
+        with player.batch() as batch:
+            batch.play_specific_file(
+                "/01/FROTHER.MP3" if i % 2 else "/01/ESPRESSO.MP3"
+            )
+            batch.set_volume(8)
+        if clock.ok_time is not None:
+            latencies.append(int((clock.ok_time - start) * 1000000))
+    return summarize(latencies)
+
+
+def bench_secret_game_beep(driver, iterations, jitter_ms):
+    """
+    Button press to OK for the SecretGame beep path, from the pin edge through
+    the debouncer to the beep command.
+    """
+    sys.path.insert(0, REPO_DIR)
+    import secretgame
+    from buttons import ButtonEvents
+
+    player, emulator = make_player(driver, jitter_ms, seed=3)
+    clock = ReplyClock(emulator)
+    player.uart = player.reader.uart = clock
+    left = micropython_shim.Pin(2)
+    right = micropython_shim.Pin(3)
+    buttons = ButtonEvents((left, right))
+    buttons.DEBOUNCE_MS = 0  # Presses are back to back; bounce is not modelled
+    buttons.CHORD_WINDOW_MS = 0  # Lone presses only; the window is a constant
+    game = secretgame.SecretGame(player, lambda level, message, *args: None)
+    latencies = []
+    for i in range(iterations):
+        game.in_game_mode = True
+        game.matcher.reset()
+        clock.mark()
+        left.set_level(0)
+        start = time.perf_counter()
+        buttons.poll()
+        game.handle_event(*buttons.get())
+        left.set_level(1)
+        buttons.poll()
+        buttons.get()  # The release
+        if clock.ok_time is not None:
+            latencies.append(int((clock.ok_time - start) * 1000000))
+    return summarize(latencies)
+
+
+def bench_group(driver, iterations, jitter_ms, units=3):
+    """
+    Time to start a file on several units through a PlayerGroup, against
+    doing it one unit after another.
+    """
+    from playergroup import PlayerGroup
+
+    players = [
+        make_player(driver, jitter_ms, seed=10 + unit)[0]
+        for unit in range(units)
+    ]
+    group = PlayerGroup(players)
+    together = []
+    spreads = []
+    one_by_one = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        group.play_specific_file("/01/ESPRESSO.MP3")
+        together.append(int((time.perf_counter() - start) * 1000000))
+        spreads.append(group.spread_us)
+        start = time.perf_counter()
+        for player in players:
+            player.play_specific_file("/01/ESPRESSO.MP3")
+        one_by_one.append(int((time.perf_counter() - start) * 1000000))
+    return {
+        "units": units,
+        "group": summarize(together),
+        "sequential": summarize(one_by_one),
+        "write_spread": summarize(spreads),
+    }
+
+
+def git_revision():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "describe", "--always", "--dirty"],
+                cwd=REPO_DIR,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument(
+        "--jitter", type=float, default=2, help="Emulator jitter in ms"
+    )
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "iterations": args.iterations,
+        "jitter_ms": args.jitter,
+        "drivers": {},
+    }
+    for name, driver in load_drivers().items():
+        result = bench_commands(driver, args.iterations, args.jitter)
+        result["button_to_ok"] = {
+            "frother_espresso": bench_frother_press(
+                driver, args.iterations, args.jitter
+            ),
+            "secret_game_beep": bench_secret_game_beep(
+                driver, args.iterations, args.jitter
+            ),
+        }
+        result["group"] = bench_group(driver, args.iterations, args.jitter)
+        report["drivers"][name] = result
+
+        print(f"{name} driver: {result['commands_per_second']:.1f} commands/s")
+        for label, entry in result["commands"].items():
+            print(
+                f"  {label:<11} p50 {entry['p50_us']:>6} us"
+                f"  p95 {entry['p95_us']:>6} us  p99 {entry['p99_us']:>6} us"
+                f"  {entry['alloc_bytes_per_command']:>7.0f} B/cmd"
+            )
+        for path, entry in result["button_to_ok"].items():
+            print(f"  press->OK {path}: p50 {entry['p50_us']} us")
+        group = result["group"]
+        print(
+            f"  {group['units']} units: group p50 {group['group']['p50_us']} us,"
+            f" sequential p50 {group['sequential']['p50_us']} us,"
+            f" write spread p50 {group['write_spread']['p50_us']} us"
+        )
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
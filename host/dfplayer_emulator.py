@@ -0,0 +1,376 @@
+# Description: A pure-Python emulator of the DFPlayer Pro's AT command
+# protocol behind a UART-like interface (write, read, readinto, any), so the
+# drivers can be run, benchmarked and regression-tested on a desktop Python
+# without hardware.
+# License: MIT
+
+import random
+import time
+
+# Default contents of the emulated flash: (path, duration in seconds)
+DEFAULT_FILES = (
+    ("/01/FROTHER.MP3", 12),
+    ("/01/ESPRESSO.MP3", 25),
+    ("/02/ST-MARIO.MP3", 3),
+    ("/02/NO-MARIO.MP3", 2),
+    ("/02/BEEP1.MP3", 1),
+    ("/02/BEEP2.MP3", 1),
+    ("/02/TM-SOOTY.MP3", 8),
+    ("/02/TM-SHARK.MP3", 8),
+)
+
+
+class DFPlayerProEmulator:
+    """
+    Emulate a DFPlayer Pro on the other end of a UART.
+
+    Pass an instance to a driver as its UART, e.g.
+    ``DFPlayerPro(1, 7, 6, uart=DFPlayerProEmulator())``. Each command is
+    answered after a per-command latency (plus optional random jitter and the
+    time the reply takes at the current baud rate). Commands are processed in
+    order, so pipelined commands queue up as they would on the device.
+    """
+
+    BAUD_RATES = (9600, 19200, 38400, 57600, 115200)
+    DEFAULT_LATENCY_MS = 5
+    LATENCY_MS = {  # Commands that touch the flash are slower
+        "PLAYFILE": 40,
+        "PLAYNUM": 30,
+        "DEL": 80,
+        "REC": 50,
+        "QUERY": 8,
+    }
+    OK = b"OK\r\n"
+    ERROR = b"error\r\n"
+
+    def __init__(
+        self,
+        files=DEFAULT_FILES,
+        latency_ms=None,
+        jitter_ms=0,
+        baudrate=115200,
+        seed=None,
+        clock=time.monotonic,
+    ):
+        """
+        Initialize the emulator.
+
+        :param files: Iterable of (path, duration in seconds) for the flash.
+        :param latency_ms: Dict of per-command latencies in milliseconds keyed
+            by command name (e.g. "VOL", "PLAYFILE"), merged over LATENCY_MS.
+        :param jitter_ms: Maximum random extra latency per reply.
+        :param baudrate: The initial baud rate of both the device and the host.
+        :param seed: Seed for the jitter random number generator.
+        :param clock: Function returning the time in seconds.
+        """
+        self.files = [[path, duration] for path, duration in files]
+        self.latency_ms = dict(self.LATENCY_MS)
+        if latency_ms:
+            self.latency_ms.update(latency_ms)
+        self.jitter_ms = jitter_ms
+        self.random = random.Random(seed)
+        self.clock = clock
+
+        self.baudrate = baudrate  # Host side, changed with init()
+        self.device_baudrate = baudrate
+        self.volume = 20
+        self.play_mode = 1
+        self.amplifier = True
+        self.prompt_tone = True
+        self.led = True
+        self.current = 0  # Index into files
+        self.playing = False
+        self.position = 0.0  # Seconds into the current file...
+        self.position_time = self.clock()  # ...as of this time
+
+        self.rx = bytearray()  # Bytes written by the host, not yet parsed
+        self.pending = []  # [ready time, reply bytes, baud rate], in order
+        self.tx = bytearray()  # Reply bytes ready to be read
+        self.busy_until = 0.0  # When the device finishes its current command
+        self.commands = []  # Every command received, for inspection
+
+    # UART interface
+
+    def init(self, baudrate=None, **kwargs):
+        """
+        Reconfigure the host side of the link, like machine.UART.init().
+        """
+        if baudrate is not None:
+            self.baudrate = baudrate
+
+    def write(self, buf):
+        """
+        Receive bytes from the host.
+
+        :return: The number of bytes written.
+        """
+        if self.baudrate != self.device_baudrate:
+            return len(buf)  # Garbled at the wrong baud rate
+        self.rx.extend(buf)
+        while True:
+            end = self.rx.find(b"\r\n")
+            if end < 0:
+                break
+            line = bytes(self.rx[:end])
+            del self.rx[: end + 2]
+            self._receive(line)
+        return len(buf)
+
+    def any(self):
+        """
+        :return: The number of reply bytes ready to be read.
+        """
+        self._collect()
+        return len(self.tx)
+
+    def read(self, nbytes=-1):
+        """
+        :return: Up to nbytes ready reply bytes, or None if there are none.
+        """
+        self._collect()
+        if not self.tx:
+            return None
+        if nbytes is None or nbytes < 0:
+            nbytes = len(self.tx)
+        data = bytes(self.tx[:nbytes])
+        del self.tx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        """
+        Copy ready reply bytes into buf.
+
+        :return: The number of bytes copied, or None if there were none.
+        """
+        self._collect()
+        if not self.tx:
+            return None
+        count = len(buf) if nbytes is None else min(nbytes, len(buf))
+        count = min(count, len(self.tx))
+        buf[:count] = self.tx[:count]
+        del self.tx[:count]
+        return count
+
+    def flush(self):
+        pass
+
+    # Host-side helpers
+
+    def inject(self, line):
+        """
+        Queue an unsolicited line from the device, after any reply in progress.
+
+        :param line: The line to send, without CRLF.
+        """
+        self._reply(line + b"\r\n", 0)
+
+    def file_name(self, index=None):
+        """
+        :return: The file name (without folder) of a file, default the current one.
+        """
+        path = self.files[self.current if index is None else index][0]
+        return path.rsplit("/", 1)[-1]
+
+    def played_time(self):
+        """
+        :return: Seconds played of the current file, as the device reports it.
+        """
+        self._advance()
+        return int(self.position)
+
+    # Emulation
+
+    def _collect(self):
+        """
+        Move replies whose time has come into the readable buffer.
+        """
+        now = self.clock()
+        while self.pending and self.pending[0][0] <= now:
+            _, data, baudrate = self.pending.pop(0)
+            if baudrate == self.baudrate:  # Otherwise the host sees garbage
+                self.tx.extend(data)
+
+    def _reply(self, data, latency_ms):
+        """
+        Schedule a reply after the device finishes its earlier work.
+        """
+        start = max(self.clock(), self.busy_until)
+        if self.jitter_ms:
+            latency_ms += self.random.uniform(0, self.jitter_ms)
+        transfer = len(data) * 10 / self.device_baudrate  # 8N1 frames
+        self.busy_until = start + latency_ms / 1000 + transfer
+        self.pending.append([self.busy_until, data, self.device_baudrate])
+
+    def _advance(self):
+        """
+        Bring the play position up to date, moving on at the end of a file.
+        """
+        now = self.clock()
+        if not self.playing or not self.files:
+            self.position_time = now
+            return
+        self.position += now - self.position_time
+        self.position_time = now
+        duration = self.files[self.current][1]
+        while self.position >= duration:
+            self.position -= duration
+            if self.play_mode == 3:  # Play one song and pause
+                self.position = 0.0
+                self.playing = False
+                return
+            if self.play_mode == 2:  # Repeat all
+                self.current = (self.current + 1) % len(self.files)
+            elif self.play_mode == 4:  # Random
+                self.current = self.random.randrange(len(self.files))
+            elif self.play_mode == 5:  # Repeat all in the folder
+                self.current = self._next_in_folder()
+            duration = self.files[self.current][1]
+
+    def _next_in_folder(self):
+        folder = self.files[self.current][0].rsplit("/", 1)[0]
+        index = self.current
+        while True:
+            index = (index + 1) % len(self.files)
+            if self.files[index][0].rsplit("/", 1)[0] == folder:
+                return index
+
+    def _start(self, index, position=0.0):
+        self.current = index
+        self.position = float(position)
+        self.position_time = self.clock()
+        self.playing = True
+
+    def _receive(self, line):
+        """
+        Handle one command line from the host.
+        """
+        self.commands.append(line)
+        self._advance()
+        name = b""
+        argument = b""
+        if line.startswith(b"AT+"):
+            name, _, argument = line[3:].partition(b"=")
+        elif line != b"AT":
+            self._reply(self.ERROR, self.DEFAULT_LATENCY_MS)
+            return
+        name = name.decode()
+        latency = self.latency_ms.get(name, self.DEFAULT_LATENCY_MS)
+        try:
+            handler = getattr(self, "_cmd_" + name.lower()) if name else None
+            reply = handler(argument) if handler else self.OK
+        except (AttributeError, ValueError, IndexError):
+            reply = self.ERROR
+        if reply:
+            self._reply(reply, latency)
+
+    def _cmd_vol(self, argument):
+        if argument == b"?":
+            return b"VOL=[%d]\r\n" % self.volume
+        if argument[:1] in (b"+", b"-"):
+            volume = self.volume + int(argument)
+        else:
+            volume = int(argument)
+        self.volume = min(max(volume, 0), 30)
+        return self.OK
+
+    def _cmd_playmode(self, argument):
+        if argument == b"?":
+            return b"PLAYMODE=[%d]\r\n" % self.play_mode
+        mode = int(argument)
+        if not 1 <= mode <= 5:
+            raise ValueError(mode)
+        self.play_mode = mode
+        return self.OK
+
+    def _cmd_playfile(self, argument):
+        path = argument.decode().upper()
+        for index, (name, _) in enumerate(self.files):
+            if name.upper() == path:
+                self._start(index)
+                return self.OK
+        return self.ERROR
+
+    def _cmd_play(self, argument):
+        if argument == b"PP":
+            if self.playing:
+                self.playing = False
+            else:
+                self.position_time = self.clock()
+                self.playing = True
+        elif argument == b"NEXT":
+            self._start((self.current + 1) % len(self.files))
+        elif argument == b"LAST":
+            self._start((self.current - 1) % len(self.files))
+        else:
+            raise ValueError(argument)
+        return self.OK
+
+    def _cmd_time(self, argument):
+        duration = self.files[self.current][1]
+        if argument[:1] in (b"+", b"-"):
+            position = self.position + int(argument)
+        else:
+            position = int(argument)
+        self.position = float(min(max(position, 0), duration))
+        return self.OK
+
+    def _cmd_query(self, argument):
+        query = int(argument)
+        if query == 1:
+            return b"%d\r\n" % (self.current + 1)
+        if query == 2:
+            return b"%d\r\n" % len(self.files)
+        if query == 3:
+            return b"%d\r\n" % int(self.position)
+        if query == 4:
+            return b"%d\r\n" % self.files[self.current][1]
+        if query == 5:
+            return self.file_name().encode("utf-16-le") + b"\r\n"
+        raise ValueError(query)
+
+    def _cmd_playnum(self, argument):
+        number = int(argument)
+        if not 1 <= number <= len(self.files):
+            return self.ERROR
+        self._start(number - 1)
+        return self.OK
+
+    def _cmd_del(self, argument):
+        if not self.files:
+            return self.ERROR
+        del self.files[self.current]
+        self.playing = False
+        self.position = 0.0
+        self.current = min(self.current, max(len(self.files) - 1, 0))
+        return self.OK
+
+    def _on_off(self, argument):
+        if argument not in (b"ON", b"OFF"):
+            raise ValueError(argument)
+        return argument == b"ON"
+
+    def _cmd_amp(self, argument):
+        self.amplifier = self._on_off(argument)
+        return self.OK
+
+    def _cmd_prompt(self, argument):
+        self.prompt_tone = self._on_off(argument)
+        return self.OK
+
+    def _cmd_led(self, argument):
+        self.led = self._on_off(argument)
+        return self.OK
+
+    def _cmd_rec(self, argument):
+        if argument not in (b"RP", b"SAVE"):
+            raise ValueError(argument)
+        return self.OK
+
+    def _cmd_baudrate(self, argument):
+        baudrate = int(argument)
+        if baudrate not in self.BAUD_RATES:
+            raise ValueError(baudrate)
+        # The OK still goes out at the old rate; the new one applies after it
+        self._reply(self.OK, self.DEFAULT_LATENCY_MS)
+        self.device_baudrate = baudrate
+        return b""
@@ -0,0 +1,129 @@
+# Description: Minimal stand-ins for the MicroPython modules the drivers
+# import (machine, utime, micropython), so the library can be imported and
+# run on a desktop Python against the DFPlayer Pro emulator.
+# License: MIT
+
+import os
+import sys
+import time
+import types
+
+TICKS_PERIOD = 1 << 30  # MicroPython ticks wrap at this value
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "lib")
+
+
+def ticks_ms():
+    return int(time.monotonic() * 1000) & TICKS_MAX
+
+
+def ticks_us():
+    return int(time.monotonic() * 1000000) & TICKS_MAX
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    offset = (ticks1 - ticks2 + TICKS_HALFPERIOD) & TICKS_MAX
+    return offset - TICKS_HALFPERIOD
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    time.sleep(us / 1000000)
+
+
+class Pin:
+    """
+    A GPIO pin whose level is set from the host, e.g. to simulate a button.
+    """
+
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    def __init__(self, pin_id, mode=-1, pull=-1, value=1):
+        self.id = pin_id
+        self.level = value
+        self.handler = None
+        self.trigger = 0
+
+    def value(self, level=None):
+        if level is None:
+            return self.level
+        self.set_level(level)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        self.handler = handler
+        self.trigger = trigger
+
+    def set_level(self, level):
+        """
+        Change the pin level from the host, firing the IRQ handler if armed.
+        """
+        level = 1 if level else 0
+        if level == self.level:
+            return
+        self.level = level
+        edge = self.IRQ_RISING if level else self.IRQ_FALLING
+        if self.handler and self.trigger & edge:
+            self.handler(self)
+
+
+class UART:
+    """
+    Placeholder for machine.UART. On the host, pass a UART-like object such as
+    DFPlayerProEmulator to the driver instead.
+    """
+
+    def __init__(self, *args, **kwargs):
+        raise OSError("No UART hardware on the host; pass uart=... instead")
+
+
+def const(value):
+    return value
+
+
+def schedule(function, argument):
+    function(argument)
+    return True
+
+
+def install():
+    """
+    Register the stand-in modules (unless real ones exist) and put lib/ on
+    sys.path, so the drivers can be imported as on the board.
+    """
+    if LIB_DIR not in sys.path:
+        sys.path.insert(0, LIB_DIR)
+
+    utime = types.ModuleType("utime")
+    for name in ("ticks_ms", "ticks_us", "ticks_add", "ticks_diff"):
+        setattr(utime, name, globals()[name])
+    utime.sleep_ms = sleep_ms
+    utime.sleep_us = sleep_us
+    utime.sleep = time.sleep
+    utime.time = time.time
+    sys.modules.setdefault("utime", utime)
+
+    machine = types.ModuleType("machine")
+    machine.Pin = Pin
+    machine.UART = UART
+    machine.idle = lambda: time.sleep(0.0005)  # Until the next "interrupt"
+    sys.modules.setdefault("machine", machine)
+
+    micropython = types.ModuleType("micropython")
+    micropython.const = const
+    micropython.schedule = schedule
+    micropython.alloc_emergency_exception_buf = lambda size: None
+    sys.modules.setdefault("micropython", micropython)
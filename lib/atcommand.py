@@ -0,0 +1,230 @@
+# Description: AT command encoding for the DFPlayer Pro drivers. Command
+# prefixes are constants, and each command is assembled in one reusable
+# output buffer with numeric arguments written as ASCII digits in place, so
+# sending a command does no string formatting and allocates nothing.
+# License: MIT
+
+# Command prefixes: everything before the argument
+AT = b"AT"
+VOL = b"AT+VOL="
+VOL_QUERY = b"AT+VOL=?"
+PLAYMODE = b"AT+PLAYMODE="
+PLAYMODE_QUERY = b"AT+PLAYMODE=?"
+PLAYFILE = b"AT+PLAYFILE="
+PLAY_PAUSE = b"AT+PLAY=PP"
+PLAY_NEXT = b"AT+PLAY=NEXT"
+PLAY_LAST = b"AT+PLAY=LAST"
+TIME = b"AT+TIME="
+TIME_BACK = b"AT+TIME=-"
+TIME_FORWARD = b"AT+TIME=+"
+QUERY_CURRENT = b"AT+QUERY=1"
+QUERY_TOTAL_FILES = b"AT+QUERY=2"
+QUERY_PLAYED_TIME = b"AT+QUERY=3"
+QUERY_TOTAL_TIME = b"AT+QUERY=4"
+QUERY_FILE_NAME = b"AT+QUERY=5"
+PLAYNUM = b"AT+PLAYNUM="
+DELETE = b"AT+DEL"
+AMP = b"AT+AMP="
+REC_PAUSE = b"AT+REC=RP"
+REC_SAVE = b"AT+REC=SAVE"
+BAUDRATE = b"AT+BAUDRATE="
+PROMPT = b"AT+PROMPT="
+LED = b"AT+LED="
+
+# Commands that are answered with OK, or an error, and nothing else
+ACKNOWLEDGED = (
+    AT,
+    VOL,
+    PLAYMODE,
+    PLAYFILE,
+    PLAY_PAUSE,
+    PLAY_NEXT,
+    PLAY_LAST,
+    TIME,
+    TIME_BACK,
+    TIME_FORWARD,
+    PLAYNUM,
+    DELETE,
+    AMP,
+    REC_PAUSE,
+    REC_SAVE,
+    BAUDRATE,
+    PROMPT,
+    LED,
+)
+# Commands that do the same thing if sent twice, so they can be retried after
+# a timeout (the first attempt may have been carried out with its reply lost).
+# PLAYFILE and PLAYNUM are left out: a slow reply would restart the track.
+REPEATABLE = (
+    AT,
+    VOL,
+    VOL_QUERY,
+    PLAYMODE,
+    PLAYMODE_QUERY,
+    TIME,
+    QUERY_CURRENT,
+    QUERY_TOTAL_FILES,
+    QUERY_PLAYED_TIME,
+    QUERY_TOTAL_TIME,
+    QUERY_FILE_NAME,
+    AMP,
+    PROMPT,
+    LED,
+)
+# Queries answered with a bare decimal number
+NUMBER_QUERIES = (
+    QUERY_CURRENT,
+    QUERY_TOTAL_FILES,
+    QUERY_PLAYED_TIME,
+    QUERY_TOTAL_TIME,
+)
+# How the reply to each other query starts (file names can be anything)
+QUERY_REPLIES = {
+    VOL_QUERY: b"VOL=",
+    PLAYMODE_QUERY: b"PLAYMODE=",
+    QUERY_FILE_NAME: b"",
+}
+
+
+def starts_with(line, text, fold=False):
+    """
+    Compare the start of a line with some text, without copying the line.
+
+    :param line: The line, as bytes or a memoryview.
+    :param text: The bytes to look for.
+    :param fold: If True, ignore the case of ASCII letters.
+    :return: True if the line starts with the text.
+    """
+    if len(line) < len(text):
+        return False
+    for i in range(len(text)):
+        if fold:
+            if line[i] | 0x20 != text[i] | 0x20:
+                return False
+        elif line[i] != text[i]:
+            return False
+    return True
+
+
+def is_reply(prefix, line):
+    """
+    Check whether a received line can be the reply to a command, rather than
+    a message the module sent on its own.
+
+    An error is a reply to any command. Otherwise a command in ACKNOWLEDGED
+    only takes OK, and a query only takes its value: the module never
+    answers a query with OK.
+
+    :param prefix: The command prefix, e.g. VOL. Commands not in the tables
+        above (such as raw commands) accept any line.
+    :param line: The line, as bytes or a memoryview.
+    :return: True if the line can be the reply.
+    """
+    if starts_with(line, b"err", True):
+        return True
+    if prefix in ACKNOWLEDGED:
+        return starts_with(line, b"OK")
+    if prefix in NUMBER_QUERIES:
+        return len(line) > 2 and 0x30 <= line[0] <= 0x39
+    expected = QUERY_REPLIES.get(prefix)
+    if expected is None:
+        return True  # Unknown command; take whatever comes
+    return starts_with(line, expected) and not starts_with(line, b"OK")
+
+
+class CommandEncoder:
+    """
+    Assemble AT commands, with their CRLF terminator, in a reusable buffer.
+
+    ``encode`` returns a memoryview of the finished command, ready for a single
+    ``uart.write``. It is only valid until the next call to ``encode``.
+    """
+
+    BUFFER_SIZE = 128  # Longest command, including argument and CRLF
+
+    def __init__(self, size=BUFFER_SIZE):
+        """
+        Initialize the encoder.
+
+        :param size: The size of the output buffer in bytes.
+        """
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    def encode(self, prefix, argument=None):
+        """
+        Build a command from a prefix and an optional argument.
+
+        :param prefix: The command prefix (bytes), e.g. VOL.
+        :param argument: An int (written as ASCII digits), a str or bytes, or
+            None for commands without an argument.
+        :return: A memoryview of the command including the CRLF terminator.
+        """
+        buffer = self.buffer
+        end = len(prefix)
+        if end + 2 > len(buffer):
+            raise ValueError("Command too long")
+        buffer[:end] = prefix
+        if argument is not None:
+            if isinstance(argument, int):
+                end = self._write_int(end, argument)
+            else:
+                end = self._write_text(end, argument)
+        if end + 2 > len(buffer):
+            raise ValueError("Command too long")
+        buffer[end] = 0x0D
+        buffer[end + 1] = 0x0A
+        return self.view[: end + 2]
+
+    def _write_int(self, pos, value):
+        """
+        Write an integer as ASCII digits.
+
+        :param pos: Where to start writing.
+        :param value: The integer to write.
+        :return: The position after the last digit.
+        """
+        buffer = self.buffer
+        if value < 0:
+            buffer[pos] = 0x2D  # "-"
+            pos += 1
+            value = -value
+        digits = 1
+        remaining = value
+        while remaining >= 10:
+            remaining //= 10
+            digits += 1
+        end = pos + digits
+        if end + 2 > len(buffer):
+            raise ValueError("Command too long")
+        for i in range(end - 1, pos - 1, -1):
+            buffer[i] = 0x30 + value % 10
+            value //= 10
+        return end
+
+    def _write_text(self, pos, text):
+        """
+        Write a str (UTF-8 encoded) or bytes argument.
+
+        :param pos: Where to start writing.
+        :param text: The str or bytes to write.
+        :return: The position after the last byte.
+        """
+        buffer = self.buffer
+        limit = len(buffer) - 2
+        if isinstance(text, str):
+            for char in text:
+                code = ord(char)
+                if code < 0x80:
+                    if pos >= limit:
+                        raise ValueError("Command too long")
+                    buffer[pos] = code
+                    pos += 1
+                else:
+                    pos = self._write_text(pos, char.encode())
+            return pos
+        end = pos + len(text)
+        if end > limit:
+            raise ValueError("Command too long")
+        buffer[pos:end] = text
+        return end
@@ -0,0 +1,122 @@
+# Description: Baud rate negotiation for the DFPlayer Pro drivers. Finds the
+# rate the module is currently using, moves both ends to the fastest rate
+# that passes a short loopback test, and remembers it so the next boot goes
+# straight to that rate.
+# License: MIT
+
+# Rates the DFPlayer Pro supports, fastest first
+BAUD_RATES = (115200, 57600, 38400, 19200, 9600)
+DEFAULT_PATH = "baud.cfg"
+LOOPBACK_COUNT = 8  # AT round trips a rate must survive to be kept
+
+
+def is_ok(response):
+    return response is not None and bytes(response[:2]) == b"OK"
+
+
+def set_host_rate(player, rate):
+    """
+    Reconfigure the board's side of the UART.
+    """
+    player.uart.init(baudrate=rate)
+    player.reader.flush()
+    player.latency.reset()  # Round trips change with the rate
+
+
+def probe(player, rate):
+    """
+    Check whether the module answers AT at a given rate.
+
+    :return: True if it does.
+    """
+    set_host_rate(player, rate)
+    latency = player.latency
+    retries = latency.retries
+    latency.retries = 0  # A wrong rate times out; don't wait for it twice
+    try:
+        return is_ok(player.test_connection())
+    finally:
+        latency.retries = retries
+
+
+def loopback(player, count=LOOPBACK_COUNT):
+    """
+    :return: True if ``count`` AT commands in a row are answered OK.
+    """
+    for _ in range(count):
+        if not is_ok(player.test_connection()):
+            return False
+    return True
+
+
+def find_rate(player, rates=BAUD_RATES, first=None):
+    """
+    Find the rate the module is using.
+
+    :param first: A rate to try before the others, e.g. the stored one.
+    :return: The rate, or None if the module did not answer at any rate.
+    """
+    if first is not None and probe(player, first):
+        return first
+    for rate in rates:
+        if rate != first and probe(player, rate):
+            return rate
+    return None
+
+
+def load_rate(path=DEFAULT_PATH):
+    try:
+        with open(path) as rate_file:
+            return int(rate_file.read())
+    except (OSError, ValueError):
+        return None
+
+
+def save_rate(rate, path=DEFAULT_PATH):
+    with open(path, "w") as rate_file:
+        rate_file.write(str(rate))
+
+
+def negotiate(player, rates=BAUD_RATES, path=DEFAULT_PATH, upgrade=True):
+    """
+    Bring the module and the board to the fastest reliable common rate.
+
+    The stored rate from the last run is tried first, so a normal boot costs a
+    single AT round trip. Otherwise every rate is probed, and (if ``upgrade``)
+    faster rates are tried in turn, falling back if one fails the loopback
+    test. The result is stored for next time.
+
+    :param player: A DFPlayerPro instance.
+    :param rates: The rates to consider, fastest first.
+    :param path: Where the chosen rate is stored, or None to not store it.
+    :param upgrade: Whether to try moving to a faster rate.
+    :return: The rate in use, or None if the module could not be found.
+    """
+    stored = load_rate(path) if path else None
+    current = find_rate(player, rates, stored)
+    if current is None:
+        return None
+    if current == stored:
+        return current  # Already agreed on a previous boot
+
+    if upgrade:
+        for rate in rates:
+            if rate <= current:
+                break
+            if not is_ok(player.set_baud_rate(rate)):
+                continue
+            set_host_rate(player, rate)
+            if loopback(player):
+                current = rate
+                break
+            # Not reliable: find the module again and put it back
+            found = find_rate(player, rates, current)
+            if found is None:
+                return None
+            if found != current:
+                player.set_baud_rate(current)
+                set_host_rate(player, current)
+
+    if path:
+        save_rate(current, path)
+    return current
@@ -0,0 +1,227 @@
+# Description: Startup configuration for the DFPlayer Pro drivers. The
+# desired settings are compared with the ones applied on an earlier boot,
+# kept on the board's filesystem with a hash, and only the changes are sent,
+# in one burst whose replies are checked from the main loop instead of
+# holding up startup.
+# License: MIT
+
+from utime import ticks_ms, ticks_diff, sleep_ms
+import os
+import atcommand
+import responseparser
+
+DEFAULT_PATH = "boot.cfg"
+
+# The command that writes each setting
+SETTINGS = {
+    "volume": atcommand.VOL,
+    "play_mode": atcommand.PLAYMODE,
+    "amplifier": atcommand.AMP,
+    "prompt_tone": atcommand.PROMPT,
+    "led": atcommand.LED,
+}
+
+
+def profile_hash(text):
+    """
+    :return: The 32-bit FNV-1a hash of a string, as 8 hex digits.
+    """
+    value = 0x811C9DC5
+    for byte in text.encode():
+        value = ((value ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return "%08x" % value
+
+
+def encode(settings):
+    """
+    :param settings: A sequence of ``(setting, value)`` pairs.
+    :return: The settings as text, one ``setting=value`` line each.
+    """
+    return "".join("%s=%s\n" % (setting, value) for setting, value in settings)
+
+
+def load(path=DEFAULT_PATH):
+    """
+    Read the settings applied on an earlier boot.
+
+    :return: A ``(hash, {setting: value})`` tuple, or None if the file is
+        missing or does not match its hash.
+    """
+    try:
+        with open(path) as profile_file:
+            stored_hash = profile_file.readline().strip()
+            text = profile_file.read()
+    except OSError:
+        return None
+    if profile_hash(text) != stored_hash:
+        return None
+    values = {}
+    for line in text.split("\n"):
+        if "=" in line:
+            setting, value = line.split("=", 1)
+            values[setting] = int(value) if value.isdigit() else value
+    return stored_hash, values
+
+
+def save(settings, path=DEFAULT_PATH):
+    text = encode(settings)
+    with open(path, "w") as profile_file:
+        profile_file.write(profile_hash(text) + "\n" + text)
+
+
+def forget(path=DEFAULT_PATH):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class BootProfile:
+    """
+    Apply a fixed set of DFPlayer Pro settings at startup.
+
+    ``start()`` writes only the settings that differ from the ones stored
+    for the last boot, all in one burst, and returns straight away. When
+    nothing has changed, the volume (if it is in the profile) is queried
+    instead, to check the module still has it. Call ``update()`` on every
+    pass of the main loop; the replies are picked up through the player's
+    router as they arrive. Once they are all OK, the settings are stored,
+    and the state cache (if any) is updated. If one fails or does not
+    arrive, the stored settings are forgotten so the next boot sends them
+    all. If the module's volume has changed, the whole profile is sent again.
+
+    Commands sent before the replies are in may take one of the profile's
+    OK replies for their own; this only matters if one of them fails.
+    """
+
+    def __init__(self, player, settings, path=DEFAULT_PATH):
+        """
+        Initialize the profile.
+
+        :param player: A DFPlayerPro instance.
+        :param settings: A sequence of ``(setting, value)`` pairs, e.g.
+            ``(("prompt_tone", "OFF"), ("volume", 8))``. Settings are the
+            keys of SETTINGS, and are written in this order.
+        :param path: Where the applied settings are stored, or None to
+            always send them all.
+        """
+        self.player = player
+        self.settings = tuple(settings)
+        self.path = path
+        self.keys = []  # Command prefix of each reply still expected
+        self.values = []  # And the setting and value it confirms
+        self.sent = 0  # Commands written by the last start()
+        self.started_at = 0
+        self.ok = None  # True once verified, False if it failed
+        self.failed = False  # A reply was an error, or did not arrive
+        self.verifying = False  # Only checking settings applied before
+        self.resend = False  # Set when the module lost its settings
+
+    def start(self, force=False):
+        """
+        Write the changed settings, or the volume query that verifies them.
+
+        :param force: Send every setting, whatever was stored.
+        :return: The number of commands written.
+        """
+        player = self.player
+        encoder = player.encoder
+        self.keys = []
+        self.values = []
+        self.ok = None
+        self.failed = False
+        self.resend = False
+        stored = None if force or not self.path else load(self.path)
+        self.verifying = stored is not None and stored[0] == profile_hash(
+            encode(self.settings)
+        )
+        previous = {} if stored is None else stored[1]
+        burst = []
+        for setting, value in self.settings:
+            if self.verifying:
+                if setting != "volume":
+                    continue
+                key = atcommand.VOL_QUERY
+                burst.append(bytes(encoder.encode(key)))
+            elif previous.get(setting) != value:
+                key = SETTINGS[setting]
+                burst.append(bytes(encoder.encode(key, value)))
+            else:
+                continue
+            self.keys.append(key)
+            self.values.append((setting, value))
+        if self.verifying and player.state is not None:
+            for setting, value in self.settings:
+                setattr(player.state, setting, value)
+        self.sent = len(burst)
+        self.started_at = ticks_ms()
+        if not burst:
+            self._finish(True)
+            return 0
+        player.router.begin_command()
+        player.router.subscribe(self._on_line)
+        player.uart.write(b"".join(burst))
+        return self.sent
+
+    def _on_line(self, line):
+        # Called by the router for lines that no command is waiting for
+        if not self.keys or not atcommand.is_reply(self.keys[0], line):
+            return
+        key = self.keys.pop(0)
+        setting, value = self.values.pop(0)
+        state = self.player.state
+        if key == atcommand.VOL_QUERY:
+            try:
+                volume = responseparser.parse_volume(line)
+            except responseparser.ResponseError:
+                volume = None
+            if volume != value:
+                self.resend = True
+        elif not atcommand.starts_with(line, b"OK"):
+            self.failed = True
+        if state is not None and key != atcommand.VOL_QUERY:
+            state.confirm(setting, value, line)
+
+    def update(self):
+        """
+        Collect the replies that have arrived and finish once they all have.
+
+        :return: True while replies are still expected.
+        """
+        if self.ok is not None:
+            return False
+        self.player.router.poll()
+        if self.resend:
+            self.player.router.unsubscribe(self._on_line)
+            if self.player.state is not None:
+                self.player.state.clear()
+            self.start(force=True)
+            return True
+        if self.keys:
+            elapsed = ticks_diff(ticks_ms(), self.started_at)
+            if elapsed < self.player.RESPONSE_TIMEOUT_MS:
+                return True
+            self.failed = True  # Still missing replies
+        self.player.router.unsubscribe(self._on_line)
+        self._finish(not self.failed)
+        return False
+
+    def wait(self):
+        """
+        Block until the replies are in.
+
+        :return: True if the settings were verified.
+        """
+        while self.update():
+            sleep_ms(1)
+        return self.ok
+
+    def _finish(self, ok):
+        self.ok = ok
+        if not self.path:
+            return
+        if ok:
+            if not self.verifying:
+                save(self.settings, self.path)
+        else:
+            forget(self.path)
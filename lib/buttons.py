@@ -0,0 +1,158 @@
+# Description: Interrupt-driven button input. Edges are timestamped in the
+# pin IRQ; a tick-based debouncer in poll() turns them into press, release
+# and chord events on a queue, so the main loop reacts within milliseconds
+# of a press without sleeping.
+# License: MIT
+
+from machine import Pin
+from utime import ticks_ms, ticks_add, ticks_diff
+
+PRESS = 1
+RELEASE = 2
+CHORD = 3  # Every button held down together
+
+
+class ButtonEvents:
+    """
+    Debounced events from a set of active-low buttons.
+
+    Call ``poll()`` on every pass of the main loop, then ``get()`` until it
+    returns None. Each event is a tuple ``(kind, button, ticks)``: kind is
+    PRESS, RELEASE or CHORD, button is the index of the pin in the list given
+    to the constructor, and ticks is the ticks_ms() time of the edge. The
+    press that completes a chord is reported as CHORD instead of PRESS, with
+    the index of that button.
+
+    With more than one button, a press is held back for CHORD_WINDOW_MS in
+    case it is the first half of a chord. If the chord completes in that
+    time, only the CHORD is reported, so a two-button press does not start
+    the first button's action as well. A press held back is reported as soon
+    as the window passes, or before the next release.
+
+    Presses are reported on the first edge and further edges are ignored for
+    DEBOUNCE_MS, so a press is seen as soon as poll() runs next. A press that
+    is released again before poll() runs is still reported.
+    """
+
+    DEBOUNCE_MS = 30  # Ignore contact bounce for this long after a change
+    CHORD_WINDOW_MS = 50  # How long a press waits for the rest of a chord
+    QUEUE_SIZE = 16
+
+    def __init__(self, pins):
+        """
+        Initialize the buttons and arm their interrupts.
+
+        :param pins: A list of Pin instances, set up as inputs with pull-ups.
+        """
+        self.pins = pins
+        count = len(pins)
+        self.pressed = [False] * count  # Debounced state
+        # When the debounced state last changed
+        self.changed_at = [ticks_add(ticks_ms(), -self.DEBOUNCE_MS)] * count
+        self.settling = [False] * count  # Within DEBOUNCE_MS of a change
+        self.edge_at = [0] * count  # Set by the IRQ
+        self.edge_pressed = [False] * count  # Set by the IRQ on a falling edge
+        self.held = None  # (button, ticks, ticks_ms() seen) of a press held back
+
+        self.queue = [None] * self.QUEUE_SIZE
+        self.head = 0
+        self.tail = 0
+
+        for index, pin in enumerate(pins):
+            pin.irq(
+                handler=lambda pin, index=index: self._edge(index, pin),
+                trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING,
+            )
+
+    def _edge(self, index, pin):
+        # Runs in interrupt context: only store ints, no allocation
+        self.edge_at[index] = ticks_ms()
+        if not pin.value():
+            self.edge_pressed[index] = True
+
+    def poll(self):
+        """
+        Run the debouncer and queue any new events.
+        """
+        now = ticks_ms()
+        for index, pin in enumerate(self.pins):
+            if self.settling[index]:
+                since = ticks_diff(now, self.changed_at[index])
+                if 0 <= since < self.DEBOUNCE_MS:
+                    continue
+                self.settling[index] = False
+            level_pressed = not pin.value()
+            was_pressed = self.pressed[index]
+            # A falling edge only counts once the last change has settled;
+            # earlier ones are bounce
+            edge_pressed = self.edge_pressed[index] and (
+                ticks_diff(self.edge_at[index], self.changed_at[index])
+                >= self.DEBOUNCE_MS
+            )
+            if not was_pressed and (level_pressed or edge_pressed):
+                self._change(index, True, now)
+                if not level_pressed:
+                    # Released again before we looked; report both
+                    self._change(index, False, now)
+            elif was_pressed and not level_pressed:
+                self._change(index, False, now)
+            else:
+                self.edge_pressed[index] = False
+        held = self.held
+        if held is not None and (
+            ticks_diff(now, held[2]) >= self.CHORD_WINDOW_MS
+        ):
+            self._release_held()
+
+    def _release_held(self):
+        # Report the press held back for a chord that did not come
+        held = self.held
+        if held is not None:
+            self.held = None
+            self._put(PRESS, held[0], held[1])
+
+    def _change(self, index, pressed, now):
+        # Timestamp with the edge if the IRQ saw it, otherwise with now
+        at = self.edge_at[index]
+        if ticks_diff(now, at) > self.DEBOUNCE_MS or ticks_diff(now, at) < 0:
+            at = now
+        self.pressed[index] = pressed
+        self.changed_at[index] = now
+        self.edge_pressed[index] = False  # Edges so far are accounted for
+        self.settling[index] = True
+        if len(self.pins) == 1:
+            self._put(PRESS if pressed else RELEASE, index, at)
+        elif not pressed:
+            self._release_held()
+            self._put(RELEASE, index, at)
+        elif all(self.pressed):
+            self.held = None  # Part of the chord
+            self._put(CHORD, index, at)
+        else:
+            self._release_held()
+            self.held = (index, at, now)
+
+    def _put(self, kind, index, at):
+        following = (self.tail + 1) % self.QUEUE_SIZE
+        if following == self.head:
+            self.head = (self.head + 1) % self.QUEUE_SIZE  # Drop the oldest
+        self.queue[self.tail] = (kind, index, at)
+        self.tail = following
+
+    def get(self):
+        """
+        Take the next event from the queue.
+
+        :return: A ``(kind, button, ticks)`` tuple, or None if there are none.
+        """
+        if self.head == self.tail:
+            return None
+        event = self.queue[self.head]
+        self.head = (self.head + 1) % self.QUEUE_SIZE
+        return event
+
+    def is_pressed(self, button):
+        """
+        :return: The debounced state of a button.
+        """
+        return self.pressed[button]
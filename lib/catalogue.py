@@ -0,0 +1,162 @@
+# Description: On-flash track catalogue for the DFPlayer Pro. The device is
+# walked once to map file numbers to names; the index is saved to the board's
+# filesystem and loaded lazily, so tracks can be played by name with the
+# short AT+PLAYNUM command and the current track's name is known without a
+# UART query.
+# License: MIT
+
+
+class TrackCatalogue:
+    """
+    A number <-> name index of the files on a DFPlayer Pro.
+
+    Build it once with ``build()`` (which plays each file silently to learn
+    its name) and it is saved to ``path``. On later boots it is loaded from
+    there the first time it is needed.
+    """
+
+    DEFAULT_PATH = "tracks.idx"
+
+    def __init__(self, player, path=DEFAULT_PATH):
+        """
+        Initialize the catalogue.
+
+        :param player: The DFPlayerPro instance to play tracks on.
+        :param path: Where the index is stored on the board's filesystem.
+        """
+        self.player = player
+        self.path = path
+        self.names = None  # names[number - 1], loaded on first use
+        self.numbers = None  # Upper-case name -> number, None if ambiguous
+        self.current = None  # Number of the last track played through us
+
+    def build(self, restore_volume=None):
+        """
+        Walk every file on the device and save the index.
+
+        Each file is started at volume 0 to read its name, and playback is
+        paused at the end.
+
+        :param restore_volume: The volume to set once done, if any.
+        :return: The number of files found.
+        :raises responseparser.ResponseError: If a query fails.
+        """
+        player = self.player
+        total = player.query_total_files()
+        player.set_volume(0)
+        names = []
+        for number in range(1, total + 1):
+            player.play_file_number(number)
+            names.append(self._clean(player.query_file_name()))
+        if total:
+            player.play()  # Pause the last file
+        if restore_volume is not None:
+            player.set_volume(restore_volume)
+        self._index(names)
+        self.save()
+        return total
+
+    def save(self):
+        """
+        Write the index to the filesystem, one name per line in number order.
+        """
+        with open(self.path, "w") as index_file:
+            for name in self.names or ():
+                index_file.write(name)
+                index_file.write("\n")
+
+    def load(self):
+        """
+        Read the index from the filesystem. A missing file gives an empty index.
+        """
+        names = []
+        try:
+            with open(self.path) as index_file:
+                for line in index_file:
+                    names.append(line.rstrip("\n"))
+        except OSError:
+            pass
+        self._index(names)
+
+    def number_of(self, name):
+        """
+        Look up a file number by name.
+
+        The device reports names without their folder, so a path with a
+        folder only matches an index entry stored with that same folder, and
+        a bare name only matches if no other folder has a file of that name.
+
+        :param name: The file name or path, in any case.
+        :return: The file number, or None if it is not in the index or the
+            name is ambiguous.
+        """
+        if self.numbers is None:
+            self.load()
+        return self.numbers.get(name.upper())
+
+    def name_of(self, number):
+        """
+        Look up a file name by number.
+
+        :param number: The file number (1-based).
+        :return: The file name, or None if it is not in the index.
+        """
+        if self.names is None:
+            self.load()
+        if 1 <= number <= len(self.names):
+            return self.names[number - 1]
+        return None
+
+    def play(self, name):
+        """
+        Play a file by name using AT+PLAYNUM.
+
+        Names missing from the index, duplicated in it, or given with a
+        folder the index cannot confirm fall back to play_specific_file, so
+        give the full path if the same name is in more than one folder.
+
+        :param name: The file name or path, e.g. "/01/ESPRESSO.MP3".
+        :return: The response from the DFPlayer Pro.
+        """
+        number = self.number_of(name)
+        if number is None:
+            self.current = None
+            return self.player.play_specific_file(name)
+        self.current = number
+        return self.player.play_file_number(number)
+
+    def play_number(self, number):
+        """
+        Play a file by number, remembering it as the current track.
+
+        :param number: The file number (1-based).
+        :return: The response from the DFPlayer Pro.
+        """
+        self.current = number
+        return self.player.play_file_number(number)
+
+    def current_name(self):
+        """
+        The name of the track last started through this catalogue.
+
+        :return: The file name, or None if no track was started through it.
+        """
+        if self.current is None:
+            return None
+        return self.name_of(self.current)
+
+    def _index(self, names):
+        self.names = names
+        numbers = self.numbers = {}
+        for number, name in enumerate(names, 1):
+            path = name.upper()
+            for key in (path, path[path.rfind("/") + 1 :]):
+                # A name found in two folders maps to None
+                numbers[key] = (
+                    number if numbers.get(key, number) == number else None
+                )
+
+    @staticmethod
+    def _clean(name):
+        # Drop stray control characters left over from the reply
+        return "".join(char for char in name if char >= " ")
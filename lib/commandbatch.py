@@ -0,0 +1,139 @@
+# Description: Pipelined command batches for the DFPlayer Pro drivers.
+# Several AT commands are written in one UART burst and the reply lines are
+# matched back to the commands in order, so a batch costs about one device
+# turnaround instead of one per command.
+# License: MIT
+
+
+class CommandBatch:
+    """
+    Collect DFPlayer Pro commands and send them as one pipelined burst.
+
+    Use it through ``DFPlayerPro.batch()``::
+
+        with player.batch() as batch:
+            batch.play_specific_file("/01/001.mp3")
+            batch.set_volume(10)
+        print(batch.results, batch.ok)
+
+    Inside the ``with`` block, command methods (called on the batch or on the
+    player itself) are queued instead of sent and return None. The queue is
+    written when the block exits; ``results`` then holds one reply per command,
+    in order, as bytes (or None if that reply never arrived).
+    """
+
+    MAX_COMMANDS = 8  # Commands per burst, to fit the device's RX buffer
+
+    def __init__(self, player):
+        """
+        Initialize the batch.
+
+        :param player: The DFPlayerPro instance the commands are sent through.
+        """
+        self.player = player
+        self.commands = []
+        self.keys = []
+        self.callbacks = []
+        self.results = []
+
+    def __enter__(self):
+        self.player.active_batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.player.active_batch = None
+        if exc_type is None:
+            self.send()
+        return False
+
+    def __getattr__(self, name):
+        # Forward command methods to the player, which queues them here
+        return getattr(self.player, name)
+
+    def add(self, command, key=None):
+        """
+        Queue a command.
+
+        :param command: The complete AT command, including the CRLF terminator.
+        :param key: The command prefix, used to recognise its reply. Without
+            one, any line is taken as the reply.
+        """
+        self.commands.append(command)
+        self.keys.append(key)
+        self.callbacks.append(None)
+
+    def on_reply(self, callback):
+        """
+        Register a function to call with the reply to the last queued command.
+
+        :param callback: Called as ``callback(reply)`` once the batch is sent.
+        """
+        self.callbacks[-1] = callback
+
+    def send(self):
+        """
+        Write the queued commands and collect one reply line per command.
+
+        :return: The list of replies, in command order.
+        """
+        player = self.player
+        commands = self.commands
+        metrics = getattr(player, "metrics", None)
+        router = player.router
+        router.begin_command()  # Earlier lines go to the subscribers
+        for first in range(0, len(commands), self.MAX_COMMANDS):
+            burst = commands[first : first + self.MAX_COMMANDS]
+            if metrics is not None:
+                start = metrics.start()
+            player.uart.write(b"".join(burst))
+            for index, command in enumerate(burst, first):
+                line = router.wait_reply(
+                    self.keys[index], player.RESPONSE_TIMEOUT_MS
+                )
+                if metrics is not None:
+                    # Latency of a batched command is time since the burst
+                    metrics.record(
+                        self.keys[index] or b"BATCH",
+                        start,
+                        len(command),
+                        line,
+                        metrics.is_error(line),
+                    )
+                if line is None:
+                    # The rest of the burst may still be answered
+                    for key in self.keys[index : first + len(burst)]:
+                        router.owe(key, 1, player.latency.max_timeout_ms)
+                    break
+                self.results.append(bytes(line))
+            if len(self.results) < first + len(burst):
+                break  # The device stopped answering; don't send the rest
+        return self._finish()
+
+    def _finish(self):
+        """
+        Pad the replies that never arrived with None, call the reply
+        callbacks and empty the queue.
+
+        :return: The list of replies, in command order.
+        """
+        self.results.extend([None] * (len(self.commands) - len(self.results)))
+        for callback, result in zip(self.callbacks, self.results):
+            if callback:
+                callback(result)
+        self.commands = []
+        self.keys = []
+        self.callbacks = []
+        return self.results
+
+    @property
+    def ok(self):
+        """
+        True if every command in the batch was answered with OK. An empty
+        batch is not OK.
+        """
+        if not self.results:
+            return False
+        for result in self.results:
+            if not result or not result.startswith(b"OK"):
+                return False
+        return True
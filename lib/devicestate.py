@@ -0,0 +1,42 @@
+# Description: Shadow copy of the DFPlayer Pro's settings, used by the
+# drivers' optional state cache to skip redundant writes and to answer
+# queries without a UART round trip.
+# License: MIT
+
+
+class DeviceState:
+    """
+    The last confirmed value of each DFPlayer Pro setting.
+
+    A value of None means unknown; the next write of that setting always goes
+    to the device. Values are only recorded once the device has answered OK.
+    """
+
+    SETTINGS = ("volume", "play_mode", "amplifier", "prompt_tone", "led")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        Forget every setting, so the next write of each one is sent.
+        """
+        self.volume = None
+        self.play_mode = None
+        self.amplifier = None
+        self.prompt_tone = None
+        self.led = None
+
+    def confirm(self, setting, value, response):
+        """
+        Record the outcome of a write.
+
+        :param setting: The setting name, one of SETTINGS.
+        :param value: The value that was written.
+        :param response: The reply from the device. The value is recorded if it
+            is OK, otherwise the setting becomes unknown.
+        """
+        if response and bytes(response[:2]) == b"OK":
+            setattr(self, setting, value)
+        else:
+            setattr(self, setting, None)
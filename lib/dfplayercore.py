@@ -0,0 +1,171 @@
+# Description: Command transport shared by the DFPlayer Pro drivers. It owns
+# the UART's line reader and router, the reply deadlines and retries, the
+# metrics, the state cache and command batches, so both drivers send every
+# command through the same code.
+# License: MIT
+
+from utime import ticks_us, ticks_diff, sleep_ms
+from linereader import LineReader
+from linerouter import LineRouter
+from commandbatch import CommandBatch
+from devicestate import DeviceState
+from atcommand import CommandEncoder
+from latencymodel import LatencyModel
+from logger import DEBUG, INFO
+import atcommand
+
+
+class DFPlayerCore:
+    """
+    Send encoded AT commands to a DFPlayer Pro and wait for their replies.
+
+    The drivers subclass this and add the command methods. ``logger`` may be
+    None, in which case nothing is logged.
+    """
+
+    UART_BAUD_RATE = 115200  # Default baud rate as per the data sheet
+    RESPONSE_TIMEOUT_MS = 1000  # Deadline until a command's latency is known
+    OK_RESPONSE = b"OK\r\n"  # Returned for writes skipped by the state cache
+
+    def __init__(self, uart, cache=False, metrics=None, logger=None):
+        """
+        Initialize the transport.
+
+        :param uart: The configured UART (or UART-like object) to use.
+        :param cache: If True, keep a DeviceState of the confirmed settings.
+        :param metrics: A CommandMetrics instance to record latency, timeout
+            and error counts for every command in, or None.
+        :param logger: A Logger for debug messages, or None.
+        """
+        self.uart = uart
+        self.reader = LineReader(self.uart)
+        self.router = LineRouter(self.reader)  # Replies vs. device messages
+        self.latency = LatencyModel(self.RESPONSE_TIMEOUT_MS)
+        self.encoder = CommandEncoder()
+        self.active_batch = None  # Set while a batch() block is open
+        self.state = DeviceState() if cache else None
+        self.metrics = metrics
+        self.logger = logger
+
+    def _transmit(self, command, key):
+        """
+        Write an encoded command and wait for the reply line.
+
+        :param command: The complete command, including CRLF, as bytes or a
+            memoryview.
+        :param key: The command prefix, used to file metrics under and to pick
+            the reply deadline. Commands in atcommand.REPEATABLE are sent
+            again if they time out. The replies owed to the other attempts
+            are waited for and dropped before returning.
+        :return: The response line as a memoryview (valid until the next
+            command), or None on timeout. Inside a batch() block the command
+            is queued and None is returned.
+        """
+        if self.active_batch is not None:
+            self.active_batch.add(bytes(command), key)
+            return None
+        metrics = self.metrics
+        if metrics is not None:
+            start = metrics.start()
+        logger = self.logger
+        debug = logger is not None and logger.level >= DEBUG
+        latency = self.latency
+        retries = latency.retries if key in atcommand.REPEATABLE else 0
+        attempt = 0
+        while True:
+            self.router.begin_command()  # Earlier lines go to the subscribers
+            sent_at = ticks_us()
+            self.uart.write(command)
+            if debug:  # Don't copy the command otherwise
+                logger.log(DEBUG, "Command sent: %s", bytes(command))
+            response = self.router.wait_reply(
+                key, latency.timeout_ms(key, attempt, retries > 0)
+            )
+            if response is not None:
+                if not attempt:
+                    latency.record(key, ticks_diff(ticks_us(), sent_at))
+                break
+            if debug:
+                logger.log(DEBUG, "No complete response within timeout")
+            if not attempt:
+                latency.record_timeout(key)
+            if attempt == retries:
+                break
+            attempt += 1
+            if debug:
+                logger.log(DEBUG, "Retrying %s (attempt %d)", key, attempt)
+            sleep_ms(latency.backoff_ms(key, attempt))
+        owed = attempt + (response is None)
+        if owed:
+            # Unanswered attempts may still be answered; a retry's reply may
+            # even have been to an earlier attempt. Drop those replies.
+            self.router.owe(key, owed, latency.max_timeout_ms)
+            if response is not None:
+                response = bytes(response)  # Draining reuses the buffer
+                self.router.drain(latency.timeout_ms(key, attempt))
+        if metrics is not None:
+            metrics.record(
+                key, start, len(command), response, metrics.is_error(response)
+            )
+        return response
+
+    def batch(self):
+        """
+        Start a pipelined batch of commands.
+
+        Commands issued inside the ``with`` block are written in one burst when
+        it exits, and the replies are matched to them in order.
+
+        :return: A CommandBatch to use as a context manager.
+        """
+        return CommandBatch(self)
+
+    def _apply_setting(self, setting, value, prefix):
+        """
+        Send a setting command, unless the state cache shows it is already set.
+
+        Inside a batch() block the command is always queued, as the commands
+        before it in the batch may change the setting.
+
+        :param setting: The DeviceState setting name.
+        :param value: The value being written.
+        :param prefix: The command prefix that writes it.
+        :return: The response from the DFPlayer Pro, or None inside a batch()
+            block.
+        """
+        state = self.state
+        if state is None:
+            return self._command(prefix, value)
+        if self.active_batch is None and getattr(state, setting) == value:
+            if self.logger is not None:
+                self.logger.log(
+                    DEBUG, "Skipped redundant %s write: %s", setting, value
+                )
+            return self.OK_RESPONSE
+        response = self._command(prefix, value)
+        if self.active_batch is not None:
+            self.active_batch.on_reply(
+                lambda reply: state.confirm(setting, value, reply)
+            )
+        else:
+            state.confirm(setting, value, response)
+        return response
+
+    def set_baud_rate(self, baud_rate):
+        """
+        Set the baud rate, on the DFPlayer Pro and then on the local UART.
+
+        Once the DFPlayer Pro confirms the change, the board's UART is switched
+        to the new rate too, so the link keeps working. See autobaud.negotiate
+        for picking the rate automatically.
+
+        :param baud_rate: 9600, 19200, 38400, 57600 or 115200.
+        :return: The response from the DFPlayer Pro.
+        """
+        response = self._command(atcommand.BAUDRATE, baud_rate)
+        if response is not None and bytes(response[:2]) == b"OK":
+            self.uart.init(baudrate=baud_rate)
+            self.latency.reset()  # Round trips change with the rate
+            if self.logger is not None:
+                self.logger.log(INFO, "Baud rate changed to %d", baud_rate)
+        return response
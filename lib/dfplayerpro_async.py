@@ -0,0 +1,249 @@
+# Description: uasyncio variant of the DFPlayer Pro driver. Commands are
+# awaited instead of sleeping, so other tasks (button polling, LEDs, ...)
+# keep running while a command is in flight.
+# License: MIT
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from utime import ticks_ms, ticks_diff
+from dfplayerpro_full import DFPlayerPro
+from commandbatch import CommandBatch
+import atcommand
+import responseparser
+
+
+class AsyncDFPlayerPro(DFPlayerPro):
+    """
+    A non-blocking version of DFPlayerPro for use with uasyncio.
+
+    Every command method of DFPlayerPro is available and returns an awaitable,
+    e.g. ``await player.set_volume(10)``. While a command is in flight the
+    driver's line reader is checked every POLL_INTERVAL_MS, and the calling
+    task resumes as soon as the response line arrives. The reader is the
+    one ``router`` uses, so ``router.poll()`` can be called between commands
+    as with the blocking driver, and lines that are not the reply go to its
+    subscribers.
+    """
+
+    RESPONSE_TIMEOUT_MS = 1000  # Give up waiting for a reply after this long
+    POLL_INTERVAL_MS = 1  # Time given to other tasks between checks for data
+
+    def __init__(self, uart_instance, tx_pin, rx_pin, uart=None):
+        """
+        Initialize the DFPlayer Pro with the specified UART instance and pins.
+
+        :param uart_instance: The UART instance number (e.g., 1 for UART1).
+        :param tx_pin: The GPIO pin number for UART TX.
+        :param rx_pin: The GPIO pin number for UART RX.
+        :param uart: An already configured UART to use instead of creating one.
+        """
+        super().__init__(uart_instance, tx_pin, rx_pin, uart=uart)
+        self.lock = asyncio.Lock()  # One command in flight at a time
+
+    async def _command(self, prefix, argument=None):
+        """
+        Encode and send a command, then await the response line.
+
+        :param prefix: The command prefix, e.g. atcommand.VOL.
+        :param argument: The command argument (int, str or bytes), if any.
+        :return: The response line from the DFPlayer Pro (as a byte string),
+            or None if no response arrived within RESPONSE_TIMEOUT_MS.
+        """
+        if self._batching():
+            # Queued, with the clock moved once the reply is in
+            return DFPlayerPro._command(self, prefix, argument)
+        line = await self._exchange(prefix, argument)
+        self.clock.apply(prefix, argument, line)
+        return line
+
+    def _batching(self):
+        """
+        :return: True if the running task has a batch() block open.
+        """
+        batch = self.active_batch
+        return batch is not None and batch.task is asyncio.current_task()
+
+    async def _exchange(self, prefix, argument):
+        async with self.lock:
+            router = self.router
+            # Deliver the lines received since the last command, dropping
+            # late replies, before this command's reply can arrive
+            router.begin_command()
+            router.busy = True  # router.poll() must not take the reply
+            try:
+                # Encode under the lock: the encoder's buffer is shared
+                self.uart.write(self.encoder.encode(prefix, argument))
+                return await self._wait_reply(prefix)
+            finally:
+                router.busy = False
+
+    async def _wait_reply(self, prefix):
+        router = self.router
+        start_time = ticks_ms()
+        while True:
+            line = self.reader.readline(0)
+            if line is None:
+                if (
+                    ticks_diff(ticks_ms(), start_time)
+                    >= self.RESPONSE_TIMEOUT_MS
+                ):
+                    # It may still come; drop it when it does
+                    router.owe(prefix, 1, self.latency.max_timeout_ms)
+                    return None
+                await asyncio.sleep(self.POLL_INTERVAL_MS / 1000)
+            elif atcommand.is_reply(prefix, line):
+                # Copied, as other tasks may read before the caller resumes
+                return bytes(line)
+            else:
+                router.publish(line)  # A message the module sent itself
+
+    async def _query(self, prefix, parse):
+        """
+        Send a query, await its reply and parse it.
+
+        :param prefix: The query's command prefix, e.g. atcommand.VOL_QUERY.
+        :param parse: The responseparser function for the reply.
+        :return: The parsed value, or None inside a batch() block.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        response = await self._command(prefix)
+        if self._batching():
+            return None
+        return parse(response)
+
+    async def resync(self):
+        """
+        Do nothing: the async driver has no state cache to refresh. This is
+        here so ``await player.resync()`` works as with the blocking driver.
+        """
+
+    def batch(self):
+        """
+        Start a pipelined batch of commands, for use with ``async with``.
+
+        Commands awaited inside the block are queued and return None. When
+        the block exits, they are written in one burst and the replies are
+        awaited in order. Other tasks' commands wait until then.
+
+        :return: An AsyncCommandBatch to use as an async context manager.
+        """
+        return AsyncCommandBatch(self)
+
+    async def set_baud_rate(self, baud_rate):
+        """
+        Set the baud rate, on the DFPlayer Pro and then on the local UART.
+
+        :param baud_rate: The baud rate to set (e.g., 9600, 19200, 38400, 57600, 115200).
+        :return: The response from the DFPlayer Pro.
+        """
+        response = await self._command(atcommand.BAUDRATE, baud_rate)
+        if response is not None and bytes(response[:2]) == b"OK":
+            self.uart.init(baudrate=baud_rate)
+            self.latency.reset()  # Round trips change with the rate
+        return response
+
+    async def sync_clock(self):
+        """
+        Read the play position and track length into the playback clock.
+
+        :raises responseparser.ResponseError: If a reply could not be read.
+        """
+        played = await self.query_played_time()
+        now = ticks_ms()
+        self.clock.sync(played, await self.query_total_time(), now)
+
+    async def playback_position(self):
+        """
+        Get the play position from the playback clock, syncing it first if
+        it is due.
+
+        :return: The play position in milliseconds, or None if unknown.
+        """
+        clock = self.clock
+        if clock.sync_due():
+            try:
+                await self.sync_clock()
+            except responseparser.ResponseError:
+                clock.sync_failed()
+        return clock.position_ms()
+
+
+
+class AsyncCommandBatch(CommandBatch):
+    """
+    A CommandBatch for AsyncDFPlayerPro::
+
+        async with player.batch() as batch:
+            await batch.play_specific_file("/01/001.mp3")
+            await batch.set_volume(10)
+        print(batch.results, batch.ok)
+
+    The driver's lock is held from the start of the block until the replies
+    are in, so commands from other tasks are not queued into the batch.
+    """
+
+    def __init__(self, player):
+        super().__init__(player)
+        self.task = None  # The task that opened the block
+
+    def __enter__(self):
+        raise TypeError("use 'async with' for batches on the async driver")
+
+    async def __aenter__(self):
+        player = self.player
+        await player.lock.acquire()
+        self.task = asyncio.current_task()
+        player.active_batch = self
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        player = self.player
+        player.active_batch = None
+        try:
+            if exc_type is None:
+                await self.send()
+        finally:
+            player.lock.release()
+        return False
+
+    async def send(self):
+        """
+        Write the queued commands and await one reply line per command.
+
+        :return: The list of replies, in command order.
+        """
+        player = self.player
+        commands = self.commands
+        keys = self.keys
+        router = player.router
+        router.begin_command()  # Earlier lines go to the subscribers
+        router.busy = True
+        try:
+            for first in range(0, len(commands), self.MAX_COMMANDS):
+                burst = commands[first : first + self.MAX_COMMANDS]
+                player.uart.write(b"".join(burst))
+                end = first + len(burst)
+                for index in range(first, end):
+                    line = await player._wait_reply(keys[index])
+                    if line is None:
+                        # The rest of the burst may still be answered
+                        for key in keys[index + 1 : end]:
+                            router.owe(key, 1, player.latency.max_timeout_ms)
+                        break
+                    self.results.append(line)
+                if len(self.results) < end:
+                    break  # The device stopped answering
+        finally:
+            router.busy = False
+        return self._finish()
+
+# Example usage
+# async def main():
+#     player = AsyncDFPlayerPro(uart_instance=1, tx_pin=21, rx_pin=20)
+#     await player.set_volume(15)
+#     await player.play_specific_file('/01/001.mp3')
+#
+# asyncio.run(main())
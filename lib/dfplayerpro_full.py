@@ -0,0 +1,416 @@
+# Description: This library is a MicroPython implementation of the
+# DFPlayer Pro MP3 Player module. It is based on the data sheet provided
+# by the manufacturer.
+# The library was tested with an ESP32-C3 Super mini.
+# Author: Adam Knowles
+# Date: 2024-11-01
+# License: MIT
+
+from machine import UART, Pin
+from utime import ticks_ms
+from dfplayercore import DFPlayerCore
+from playbackclock import PlaybackClock
+import atcommand
+import playbackclock
+import responseparser
+
+
+class DFPlayerPro(DFPlayerCore):
+    """
+    A class to control the DFPlayer Pro MP3 Player module using AT commands over UART.
+    """
+
+    UART_BITS = 8
+    UART_PARITY = None
+    UART_STOP = 1
+
+    def __init__(
+        self,
+        uart_instance,
+        tx_pin,
+        rx_pin,
+        cache=False,
+        uart=None,
+        metrics=None,
+    ):
+        """
+        Initialize the DFPlayer Pro with the specified UART instance and pins.
+
+        :param uart_instance: The UART instance number (e.g., 1 for UART1).
+        :param tx_pin: The GPIO pin number for UART TX.
+        :param rx_pin: The GPIO pin number for UART RX.
+        :param cache: If True, remember the last confirmed volume, play mode,
+            amplifier, prompt tone and LED settings. Writes that would not
+            change them are skipped and query_volume/query_play_mode are
+            answered locally. Call resync() to refresh from the device.
+        :param uart: An already configured UART (or UART-like object, such as
+            the host emulator) to use instead of creating one.
+        :param metrics: A CommandMetrics instance to record latency, timeout
+            and error counts for every command in, or None.
+        """
+        if uart is None:
+            uart = UART(
+                uart_instance,
+                baudrate=self.UART_BAUD_RATE,
+                tx=Pin(tx_pin),
+                rx=Pin(rx_pin),
+                bits=self.UART_BITS,
+                parity=self.UART_PARITY,
+                stop=self.UART_STOP,
+            )
+        super().__init__(uart, cache, metrics)
+        self.clock = PlaybackClock()  # Play position without queries
+
+    def send_command(self, command):
+        """
+        Send an AT command to the DFPlayer Pro and return the response.
+
+        :param command: The AT command to send (as a byte string).
+        :return: The response line from the DFPlayer Pro as a memoryview
+            (valid until the next command), or None on timeout. Inside a
+            batch() block the command is queued and None is returned.
+        """
+        return self._command(command)
+
+    def _command(self, prefix, argument=None):
+        """
+        Encode a command from the prefix table and send it.
+
+        :param prefix: The command prefix, e.g. atcommand.VOL.
+        :param argument: The command argument (int, str or bytes), if any.
+        :return: The response, as for send_command.
+        """
+        response = self._transmit(
+            self.encoder.encode(prefix, argument), prefix
+        )
+        if prefix in playbackclock.COMMANDS:
+            clock = self.clock
+            if self.active_batch is not None:
+                self.active_batch.on_reply(
+                    lambda reply: clock.apply(prefix, argument, reply)
+                )
+            else:
+                clock.apply(prefix, argument, response)
+        return response
+
+    def _query(self, prefix, parse):
+        """
+        Send a query and parse its reply.
+
+        :param prefix: The query's command prefix, e.g. atcommand.VOL_QUERY.
+        :param parse: The responseparser function for the reply.
+        :return: The parsed value, or None inside a batch() block.
+        :raises responseparser.ResponseError: If there was no reply, the device
+            reported an error or the reply was malformed.
+        """
+        response = self._command(prefix)
+        if self.active_batch is not None:
+            return None
+        return parse(response)
+
+    def resync(self):
+        """
+        Refresh the state cache from the device.
+
+        The volume and play mode are queried; settings the device cannot
+        report (amplifier, prompt tone and LED) are forgotten so the next
+        write of each one is sent.
+        """
+        state = self.state
+        if state is None:
+            return
+        state.clear()
+        for setting, prefix, parse in (
+            ("volume", atcommand.VOL_QUERY, responseparser.parse_volume),
+            (
+                "play_mode",
+                atcommand.PLAYMODE_QUERY,
+                responseparser.parse_play_mode,
+            ),
+        ):
+            try:
+                setattr(state, setting, self._query(prefix, parse))
+            except responseparser.ResponseError:
+                pass  # Left unknown
+
+    def test_connection(self):
+        """
+        Test the connection to the DFPlayer Pro by sending a simple AT command.
+
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.AT)
+
+    def set_volume(self, volume_level):
+        """
+        Set the volume level of the DFPlayer Pro.
+
+        :param volume_level: The volume level (0-30).
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._apply_setting("volume", volume_level, atcommand.VOL)
+
+    def query_volume(self):
+        """
+        Query the current volume level of the DFPlayer Pro.
+
+        :return: The volume (0-30), or None inside a batch() block.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        state = self.state
+        if self.active_batch is not None:
+            state = None  # Queue the query; the cache may be out of date
+        if state is not None and state.volume is not None:
+            return state.volume
+        volume = self._query(atcommand.VOL_QUERY, responseparser.parse_volume)
+        if state is not None:
+            state.volume = volume
+        return volume
+
+    def set_play_mode(self, mode):
+        """
+        Set the playback mode of the DFPlayer Pro.
+
+        :param mode: The playback mode (1: repeat one song, 2: repeat all, 3: play one song and pause, 4: play randomly, 5: repeat all in the folder; see responseparser.PLAY_MODES).
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._apply_setting("play_mode", mode, atcommand.PLAYMODE)
+
+    def query_play_mode(self):
+        """
+        Query the current playback mode of the DFPlayer Pro.
+
+        :return: The playback mode, one of responseparser.PLAY_MODES, or None
+            inside a batch() block.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        state = self.state
+        if self.active_batch is not None:
+            state = None  # Queue the query; the cache may be out of date
+        if state is not None and state.play_mode is not None:
+            return state.play_mode
+        mode = self._query(
+            atcommand.PLAYMODE_QUERY, responseparser.parse_play_mode
+        )
+        if state is not None:
+            state.play_mode = mode
+        return mode
+
+    def play_specific_file(self, file_path):
+        """
+        Play a specific file on the DFPlayer Pro.
+
+        :param file_path: The path to the file to play (e.g., '/01/001.mp3').
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.PLAYFILE, file_path)
+
+    def play(self):
+        """
+        Toggle play/pause on the DFPlayer Pro.
+
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.PLAY_PAUSE)
+
+    def next_track(self):
+        """
+        Play the next track on the DFPlayer Pro.
+
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.PLAY_NEXT)
+
+    def previous_track(self):
+        """
+        Play the previous track on the DFPlayer Pro.
+
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.PLAY_LAST)
+
+    def fast_rewind(self, seconds):
+        """
+        Fast rewind the current track by a specified number of seconds.
+
+        :param seconds: The number of seconds to rewind.
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.TIME_BACK, seconds)
+
+    def fast_forward(self, seconds):
+        """
+        Fast forward the current track by a specified number of seconds.
+
+        :param seconds: The number of seconds to fast forward.
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.TIME_FORWARD, seconds)
+
+    def play_from_second(self, second):
+        """
+        Start playing the current track from a specified second.
+
+        :param second: The second to start playing from.
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.TIME, second)
+
+    def query_current_track(self):
+        """
+        Query the file number of the currently playing track.
+
+        :return: The file number of the current track.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        return self._query(atcommand.QUERY_CURRENT, responseparser.parse_int)
+
+    def query_total_files(self):
+        """
+        Query the total number of files on the DFPlayer Pro.
+
+        :return: The number of files.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        return self._query(
+            atcommand.QUERY_TOTAL_FILES, responseparser.parse_int
+        )
+
+    def query_played_time(self):
+        """
+        Query the time length the current track has played.
+
+        :return: The time played, in seconds.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        return self._query(
+            atcommand.QUERY_PLAYED_TIME, responseparser.parse_seconds
+        )
+
+    def query_total_time(self):
+        """
+        Query the total time of the currently playing track.
+
+        :return: The length of the track, in seconds.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        return self._query(
+            atcommand.QUERY_TOTAL_TIME, responseparser.parse_seconds
+        )
+
+    def sync_clock(self):
+        """
+        Read the play position and track length from the DFPlayer Pro into
+        the playback clock.
+
+        :raises responseparser.ResponseError: If a reply could not be read.
+        """
+        played = self.query_played_time()
+        now = ticks_ms()
+        self.clock.sync(played, self.query_total_time(), now)
+
+    def playback_position(self):
+        """
+        Get the play position from the playback clock, without a round trip.
+
+        The clock is synced from the DFPlayer Pro when the position is not
+        known, at the end of a track and every clock.resync_ms otherwise.
+        The length of the track is then in clock.total_ms.
+
+        :return: The play position in milliseconds, or None if unknown.
+        """
+        clock = self.clock
+        if self.active_batch is None and clock.sync_due():
+            try:
+                self.sync_clock()
+            except responseparser.ResponseError:
+                clock.sync_failed()
+        return clock.position_ms()
+
+    def query_file_name(self):
+        """
+        Query the file name of the currently playing track.
+
+        :return: The file name of the currently playing track.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        return self._query(
+            atcommand.QUERY_FILE_NAME, responseparser.parse_file_name
+        )
+
+    def decode_file_name(self, response):
+        """
+        Decode a file name response from the DFPlayer Pro.
+
+        :param response: The raw response to an AT+QUERY=5 command.
+        :return: The file name.
+        :raises responseparser.ResponseError: If the reply could not be read.
+        """
+        return responseparser.parse_file_name(response)
+
+    def play_file_number(self, file_number):
+        """
+        Play a specific file by its number.
+
+        :param file_number: The file number to play.
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.PLAYNUM, file_number)
+
+    def delete_current_file(self):
+        """
+        Delete the currently playing file.
+
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.DELETE)
+
+    def set_amplifier(self, state):
+        """
+        Turn the amplifier on or off.
+
+        :param state: The state of the amplifier ('ON' or 'OFF').
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._apply_setting("amplifier", state, atcommand.AMP)
+
+    def record(self):
+        """
+        Start or pause recording.
+
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.REC_PAUSE)
+
+    def save_recording(self):
+        """
+        Save the recorded voice.
+
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._command(atcommand.REC_SAVE)
+
+    def set_prompt_tone(self, state):
+        """
+        Turn the prompt tone on or off.
+
+        :param state: The state of the prompt tone ('ON' or 'OFF').
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._apply_setting("prompt_tone", state, atcommand.PROMPT)
+
+    def set_led(self, state):
+        """
+        Turn the LED prompt on or off.
+
+        :param state: The state of the LED prompt ('ON' or 'OFF').
+        :return: The response from the DFPlayer Pro.
+        """
+        return self._apply_setting("led", state, atcommand.LED)
+
+
+# Example usage
+# dfplayer = DFPlayerPro(uart_instance=1, tx_pin=21, rx_pin=20)
+# dfplayer.test_connection()
+# dfplayer.set_volume(15)
+# dfplayer.play_specific_file('/01/001.mp3')
@@ -0,0 +1,92 @@
+# Description: Time-based volume fades for the DFPlayer Pro drivers. A fade
+# runs in the background of the caller's main loop: each update() works out
+# where the volume should be right now and only sends that level, so a slow
+# link drops intermediate steps instead of stretching the fade.
+# License: MIT
+
+from utime import ticks_ms, ticks_diff
+from scheduler import BACKGROUND
+
+
+class VolumeFader:
+    """
+    Fade the volume of a DFPlayerPro to a target level over a set duration.
+
+    Call ``update()`` on every pass of the main loop. Starting a new fade or
+    calling ``cancel()`` stops the one in progress immediately.
+    """
+
+    MERGE_KEY = "fade"  # Scheduler key; each step supersedes the last
+
+    def __init__(self, player, scheduler=None):
+        """
+        Initialize the fader.
+
+        :param player: The DFPlayerPro instance whose volume is faded.
+        :param scheduler: A CommandScheduler to queue the steps in as
+            background commands, or None to send them directly.
+        """
+        self.player = player
+        self.scheduler = scheduler
+        self.active = False
+        self.volume = None  # Last volume sent by the fader, if known
+        self.from_volume = 0
+        self.to_volume = 0
+        self.duration_ms = 0
+        self.start_time = 0
+
+    def start(self, to_volume, duration_ms, from_volume=None):
+        """
+        Start fading towards a volume, cancelling any fade in progress.
+
+        :param to_volume: The volume level to end on (0-30).
+        :param duration_ms: How long the fade should take, in milliseconds.
+        :param from_volume: The volume level to start from. Defaults to the
+            last volume sent by this fader.
+        """
+        if from_volume is None:
+            from_volume = to_volume if self.volume is None else self.volume
+        self.from_volume = from_volume
+        self.to_volume = to_volume
+        self.duration_ms = max(duration_ms, 1)
+        self.start_time = ticks_ms()
+        self.volume = None  # Force the first step to be sent
+        self.active = True
+
+    def cancel(self):
+        """
+        Stop the fade in progress, leaving the volume where it is.
+        """
+        self.active = False
+        if self.scheduler is not None:
+            self.scheduler.cancel(self.MERGE_KEY)  # A step not sent yet
+
+    def update(self):
+        """
+        Send the volume step that is due now, if it differs from the last one.
+
+        Steps that became due while the link was busy are skipped.
+
+        :return: True while the fade is still in progress.
+        """
+        if not self.active:
+            return False
+        elapsed = ticks_diff(ticks_ms(), self.start_time)
+        if elapsed >= self.duration_ms:
+            level = self.to_volume
+            self.active = False
+        else:
+            span = self.to_volume - self.from_volume
+            level = self.from_volume + span * elapsed // self.duration_ms
+        if level != self.volume:
+            if self.scheduler is None:
+                self.player.set_volume(level)
+            else:
+                self.scheduler.submit(
+                    BACKGROUND,
+                    self.player.set_volume,
+                    (level,),
+                    self.MERGE_KEY,
+                )
+            self.volume = level
+        return self.active
@@ -0,0 +1,113 @@
+# Description: Gesture matching for button sequences. A set of patterns is
+# compiled once into a trie stored as a flat transition table, which is then
+# walked one symbol per button gesture without allocating.
+# License: MIT
+
+# Gesture symbols, by index, and the characters used for them in patterns
+TAP_LEFT = 0
+TAP_RIGHT = 1
+HOLD_LEFT = 2
+HOLD_RIGHT = 3
+BOTH = 4
+SYMBOLS = "LR<>+"  # Tap left, tap right, hold left, hold right, both together
+
+NO_STATE = -1
+
+
+class GestureMatcher:
+    """
+    Match gesture sequences against a fixed set of patterns.
+
+    Patterns are strings of SYMBOLS characters, e.g. "LR<" for tap left, tap
+    right, then a long press on the left. They are compiled into a trie whose
+    transitions are kept in one flat list: the state after symbol ``s`` in
+    state ``n`` is ``table[n * len(SYMBOLS) + s]``, or NO_STATE if no pattern
+    continues that way. Each ``step()`` is a single lookup, however many
+    patterns there are.
+    """
+
+    def __init__(self, patterns, symbols=SYMBOLS):
+        """
+        Compile the patterns.
+
+        :param patterns: A dict mapping pattern strings to values, e.g. file
+            names. Every character must be in ``symbols``.
+        :param symbols: The characters that stand for each symbol index.
+        """
+        self.symbols = symbols
+        self.width = len(symbols)
+        self.table = [NO_STATE] * self.width
+        self.values = [None]
+        self.leaf = [True]
+        longest = 0
+        for pattern, value in patterns.items():
+            state = 0
+            for char in pattern:
+                symbol = symbols.find(char)
+                if symbol < 0:
+                    raise ValueError("Unknown gesture symbol: " + char)
+                index = state * self.width + symbol
+                if self.table[index] == NO_STATE:
+                    self.table[index] = len(self.values)
+                    self.table.extend([NO_STATE] * self.width)
+                    self.values.append(None)
+                    self.leaf.append(True)
+                self.leaf[state] = False
+                state = self.table[index]
+            self.values[state] = value
+            longest = max(longest, len(pattern))
+        self.path = bytearray(longest)  # Symbols stepped so far
+        self.reset()
+
+    def reset(self):
+        """
+        Go back to the start, with no symbols matched.
+        """
+        self.state = 0
+        self.depth = 0
+
+    def can_step(self, symbol):
+        """
+        :return: True if some pattern continues with this symbol.
+        """
+        return self.table[self.state * self.width + symbol] != NO_STATE
+
+    def step(self, symbol):
+        """
+        Advance by one symbol.
+
+        :param symbol: The symbol index, e.g. TAP_LEFT.
+        :return: True, or False (leaving the state unchanged) if no pattern
+            continues with this symbol.
+        """
+        following = self.table[self.state * self.width + symbol]
+        if following == NO_STATE:
+            return False
+        self.path[self.depth] = symbol
+        self.depth += 1
+        self.state = following
+        return True
+
+    def value(self):
+        """
+        :return: The value of the pattern matched so far, or None if the
+            symbols so far are only the start of longer patterns.
+        """
+        return self.values[self.state]
+
+    def is_leaf(self):
+        """
+        :return: True if no pattern is longer than the symbols so far.
+        """
+        return self.leaf[self.state]
+
+    def sequence(self, extra=None):
+        """
+        The symbols so far as a pattern string, e.g. for logging.
+
+        :param extra: A symbol index to append, if any.
+        """
+        chars = [self.symbols[self.path[i]] for i in range(self.depth)]
+        if extra is not None:
+            chars.append(self.symbols[extra])
+        return "".join(chars)
@@ -0,0 +1,115 @@
+# Description: Adaptive reply deadlines for the DFPlayer Pro drivers. Each
+# command's round trip is tracked as a moving average with its variation,
+# the way TCP tracks round-trip time, so quick commands get short deadlines
+# and commands that touch the module's flash get long ones.
+# License: MIT
+
+
+class LatencyModel:
+    """
+    Smoothed round-trip times per command, and the deadlines they imply.
+
+    For each key (a command prefix) the model keeps ``[average_us,
+    variation_us]``, updated with an exponentially weighted moving average
+    (1/8 for the average, 1/4 for the variation). The deadline is the
+    average plus four times the variation (or half the average, if that is
+    more), kept between MIN_TIMEOUT_MS and ``max_timeout_ms``. Until a
+    command has been seen, its deadline is ``initial_timeout_ms``.
+
+    Only commands that are retried get the learned deadline. For the others
+    a timeout loses the outcome of a command the module may well carry out,
+    so they always wait at least ``initial_timeout_ms``.
+    """
+
+    MIN_TIMEOUT_MS = 50  # Never wait less than this, however quick the replies
+    RETRIES = 2  # Extra attempts after a timeout, for commands safe to repeat
+    MAX_BACKOFF_MS = 200  # Longest pause before a retry
+
+    def __init__(self, initial_timeout_ms, max_timeout_ms=None):
+        """
+        Initialize the model.
+
+        :param initial_timeout_ms: The deadline for commands not yet seen.
+        :param max_timeout_ms: The longest deadline ever used. Defaults to
+            three times the initial one.
+        """
+        self.initial_timeout_ms = initial_timeout_ms
+        self.max_timeout_ms = max_timeout_ms or 3 * initial_timeout_ms
+        self.retries = self.RETRIES
+        self.reset()
+
+    def reset(self):
+        """
+        Forget everything learned, e.g. after a baud rate change.
+        """
+        self.commands = {}
+
+    def record(self, key, elapsed_us):
+        """
+        Add a round trip to the average for a command.
+
+        Only time replies to the first attempt: a reply after a retry could
+        belong to either attempt.
+
+        :param key: The command prefix.
+        :param elapsed_us: The time from writing the command to its reply.
+        """
+        entry = self.commands.get(key)
+        if entry is None:
+            self.commands[key] = [elapsed_us, elapsed_us >> 1]
+            return
+        error = elapsed_us - entry[0]
+        entry[0] += error >> 3
+        entry[1] += (abs(error) - entry[1]) >> 2
+
+    def record_timeout(self, key):
+        """
+        Note that a command got no reply in time, doubling its variation so
+        its deadline grows if the module has become slower.
+        """
+        entry = self.commands.get(key)
+        if entry is not None:
+            entry[1] = min(entry[1] * 2 + 1000, self.max_timeout_ms * 1000)
+
+    def timeout_ms(self, key, attempt=0, repeatable=True):
+        """
+        :param key: The command prefix.
+        :param attempt: 0 for the first attempt; each retry doubles the
+            deadline.
+        :param repeatable: False if the command will not be sent again after
+            a timeout.
+        :return: How long to wait for the reply, in milliseconds.
+        """
+        entry = self.commands.get(key)
+        if entry is None:
+            timeout = self.initial_timeout_ms
+        else:
+            average, variation = entry
+            # At least half the average again, for devices that rarely vary
+            margin = max(4 * variation, average >> 1)
+            timeout = (average + margin) // 1000 + 1
+            if timeout < self.MIN_TIMEOUT_MS:
+                timeout = self.MIN_TIMEOUT_MS
+        if not repeatable and timeout < self.initial_timeout_ms:
+            timeout = self.initial_timeout_ms
+        return min(timeout << attempt, self.max_timeout_ms)
+
+    def average_ms(self, key):
+        """
+        :param key: The command prefix.
+        :return: The smoothed round trip in milliseconds, or 0 if the
+            command has not been seen yet.
+        """
+        entry = self.commands.get(key)
+        return 0 if entry is None else entry[0] // 1000
+
+    def backoff_ms(self, key, attempt):
+        """
+        :param key: The command prefix.
+        :param attempt: The retry about to be made, from 1.
+        :return: How long to pause before it, in milliseconds: the average
+            round trip, doubled for each further retry.
+        """
+        entry = self.commands.get(key)
+        average_ms = self.MIN_TIMEOUT_MS if entry is None else entry[0] // 1000
+        return min(average_ms << (attempt - 1), self.MAX_BACKOFF_MS)
@@ -0,0 +1,99 @@
+# Description: Response-terminated UART read engine shared by the DFPlayer
+# Pro drivers. Replies are read into one preallocated buffer and handed back
+# as a memoryview as soon as the CRLF terminator arrives.
+# License: MIT
+
+from utime import ticks_ms, ticks_diff, sleep_ms
+
+
+class LineReader:
+    """
+    Read CRLF-terminated lines from a UART without allocating per line.
+
+    Incoming bytes are read with ``readinto`` straight into a preallocated
+    bytearray and scanned for the terminator in place. ``readline`` returns a
+    memoryview slice of that buffer, which is only valid until the next call
+    to ``readline`` or ``flush``. Copy it with ``bytes()`` if it must be kept.
+    """
+
+    BUFFER_SIZE = 256  # Longest line we can receive, including CRLF
+    POLL_INTERVAL_MS = 1  # Idle time between checks while waiting for data
+
+    def __init__(self, uart, size=BUFFER_SIZE):
+        """
+        Initialize the reader.
+
+        :param uart: The UART (or UART-like object) to read from.
+        :param size: The size of the receive buffer in bytes.
+        """
+        self.uart = uart
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # Start of the line being assembled
+        self.end = 0  # One past the last byte received
+        self.scan = 0  # Bytes before this have been checked for the terminator
+
+    def flush(self):
+        """
+        Discard everything buffered or waiting in the UART.
+        """
+        self.start = self.end = self.scan = 0
+        while self.uart.any():
+            self.uart.readinto(self.buffer)
+
+    def readline(self, timeout_ms):
+        """
+        Wait for the next complete line.
+
+        :param timeout_ms: How long to wait for the terminator, in milliseconds.
+        :return: A memoryview of the line including its CRLF terminator, or
+            None if no complete line arrived within the timeout.
+        """
+        self._compact()
+        start_time = ticks_ms()
+        while True:
+            line = self._find_line()
+            if line is not None:
+                return line
+            if self.end == len(self.buffer):
+                # Line longer than the buffer; drop it rather than stall
+                self.start = self.end = self.scan = 0
+            waiting = self.uart.any()
+            if waiting:
+                space = len(self.buffer) - self.end
+                received = self.uart.readinto(
+                    self.view[self.end :], min(waiting, space)
+                )
+                if received:
+                    self.end += received
+                continue
+            if ticks_diff(ticks_ms(), start_time) >= timeout_ms:
+                return None
+            sleep_ms(self.POLL_INTERVAL_MS)
+
+    def _find_line(self):
+        """
+        Scan the newly received bytes for a CRLF terminator.
+
+        :return: A memoryview of the completed line, or None.
+        """
+        buffer = self.buffer
+        for i in range(max(self.scan, self.start + 1), self.end):
+            if buffer[i] == 0x0A and buffer[i - 1] == 0x0D:
+                line = self.view[self.start : i + 1]
+                self.start = self.scan = i + 1
+                return line
+        self.scan = self.end
+        return None
+
+    def _compact(self):
+        """
+        Move any bytes left over after the last line to the front of the buffer.
+        """
+        if self.start:
+            remaining = self.end - self.start
+            if remaining:
+                self.buffer[:remaining] = self.view[self.start : self.end]
+            self.scan -= self.start
+            self.end = remaining
+            self.start = 0
@@ -0,0 +1,162 @@
+# Description: Routing of received lines for the DFPlayer Pro drivers. One
+# reader owns the RX side; each line is handed to the command waiting for its
+# reply if it can be that reply, and to subscriber callbacks otherwise, so a
+# stray or unsolicited line from the module no longer takes a reply's place.
+# License: MIT
+
+from utime import ticks_ms, ticks_add, ticks_diff
+from atcommand import is_reply
+
+
+class LineRouter:
+    """
+    Split incoming data into lines and route them.
+
+    The driver calls ``wait_reply`` while a command is in flight. Between
+    commands, call ``poll()`` (e.g. once per main loop pass) to deliver
+    messages the module sends on its own as they arrive. Subscribers are
+    called as ``callback(line)`` with a memoryview that is only valid during
+    the call; copy it with ``bytes()`` to keep it.
+
+    A command that was sent more than once, or given up on, may still be
+    answered after the driver has moved on. The driver registers those
+    replies with ``owe()`` and waits for them with ``drain()``; any that are
+    still owed are dropped by ``poll()`` when they arrive before the next
+    command, so they are not taken as its reply.
+    """
+
+    def __init__(self, reader):
+        """
+        Initialize the router.
+
+        :param reader: The LineReader that owns the UART's RX side.
+        """
+        self.reader = reader
+        self.subscribers = []
+        self.unsolicited = 0  # Lines that were not a reply
+        self.owed = []  # Prefixes of the late replies still expected, in order
+        self.owed_until = 0  # ticks_ms() after which they are not expected
+        self.late = 0  # Late replies dropped
+        self.busy = False  # Set while an async command waits for its reply
+
+    def subscribe(self, callback):
+        """
+        Register a function to call with every line that is not a reply.
+
+        :param callback: Called as ``callback(line)``.
+        """
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Stop calling a function registered with ``subscribe``.
+        """
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self, line):
+        """
+        Hand a line that is not a reply to the subscribers.
+
+        :param line: The line, including its CRLF terminator.
+        """
+        self.unsolicited += 1
+        for callback in self.subscribers:
+            callback(line)
+
+    def owe(self, prefix, count, timeout_ms):
+        """
+        Expect late replies to a command, and drop them when they arrive.
+
+        :param prefix: The command prefix, used to recognise the replies.
+        :param count: The number of replies still owed.
+        :param timeout_ms: How long they may take, in milliseconds. After
+            that, the command is taken to have been lost.
+        """
+        if count <= 0:
+            return
+        self.owed.extend([prefix] * count)
+        self.owed_until = ticks_add(ticks_ms(), timeout_ms)
+
+    def drain(self, timeout_ms):
+        """
+        Wait for the owed replies and drop them, passing other lines to the
+        subscribers.
+
+        :param timeout_ms: How long to wait, in milliseconds.
+        :return: True if every owed reply arrived.
+        """
+        start_time = ticks_ms()
+        remaining = timeout_ms
+        while self.owed:
+            line = self.reader.readline(remaining)
+            if line is None:
+                return False
+            if not self._late(line):
+                self.publish(line)
+            remaining = max(0, timeout_ms - ticks_diff(ticks_ms(), start_time))
+        return True
+
+    def _late(self, line):
+        """
+        :return: True if the line is a late reply, which is then dropped.
+        """
+        owed = self.owed
+        if not owed:
+            return False
+        if ticks_diff(self.owed_until, ticks_ms()) <= 0:
+            del owed[:]  # Those commands never reached the module
+            return False
+        if not is_reply(owed[0], line):
+            return False
+        owed.pop(0)
+        self.late += 1
+        return True
+
+    def poll(self):
+        """
+        Deliver any complete lines already received, without waiting.
+
+        No command is in flight when this is called, so every line is passed
+        to the subscribers. While an async command is waiting for its reply,
+        this does nothing; the command delivers the lines instead.
+        """
+        if self.busy:
+            return
+        while True:
+            line = self.reader.readline(0)
+            if line is None:
+                return
+            if not self._late(line):
+                self.publish(line)
+
+    def begin_command(self):
+        """
+        Get ready to send a command: deliver the lines already received, then
+        drop any partial line so it cannot run into the reply. While late
+        replies are owed, a partial line is kept, as it is most likely one.
+        """
+        self.poll()
+        if not self.owed:
+            self.reader.flush()
+
+    def wait_reply(self, prefix, timeout_ms):
+        """
+        Wait for the reply to a command, passing other lines to subscribers.
+
+        :param prefix: The command prefix, used to recognise the reply.
+        :param timeout_ms: How long to wait, in milliseconds.
+        :return: The reply line as a memoryview (valid until the next read),
+            or None if no reply arrived within the timeout.
+        """
+        start_time = ticks_ms()
+        remaining = timeout_ms
+        while True:
+            line = self.reader.readline(remaining)
+            if line is None:
+                return None
+            if is_reply(prefix, line):
+                return line
+            self.publish(line)
+            remaining = max(0, timeout_ms - ticks_diff(ticks_ms(), start_time))
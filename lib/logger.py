@@ -0,0 +1,170 @@
+# Description: Levelled logging for the coffee machine sounds and the
+# DFPlayer drivers. Messages below the configured level cost one integer
+# comparison and are never formatted; the rest go into a fixed-size ring
+# buffer in RAM that can be printed on demand, so logging never waits on a
+# USB serial port with nobody listening.
+# License: MIT
+
+from utime import ticks_ms
+
+# Levels: a message is kept if its level is at most the logger's level
+NONE = -1
+ERROR = 0
+WARN = 1
+INFO = 2
+DEBUG = 3
+LEVEL_NAMES = ("ERROR", "WARN", "INFO", "DEBUG")
+LEVELS = {
+    "NONE": NONE,
+    "ERROR": ERROR,
+    "WARN": WARN,
+    "INFO": INFO,
+    "DEBUG": DEBUG,
+}
+
+HEADER_SIZE = 6  # Level, length and ticks_ms() of each record
+
+
+def level_number(level):
+    """
+    :param level: A level, as a number or a name such as "DEBUG".
+    :return: The level as a number.
+    """
+    return LEVELS[level] if isinstance(level, str) else level
+
+
+class Logger:
+    """
+    Keep the latest log messages in a ring buffer.
+
+    The buffer holds ``capacity`` records of ``record_size`` bytes each; a
+    longer message is cut short, and once the buffer is full each new record
+    replaces the oldest. The level is fixed when the logger is created.
+    Formatting arguments are only applied to messages that are kept:
+
+        logger.log(DEBUG, "Sent %s", command)
+
+    With ``echo`` set, kept messages are also printed as they are logged.
+    On a board without a USB host, print can stall until the output buffer
+    drains, so leave it off where timing matters and call ``dump()`` instead.
+    """
+
+    CAPACITY = 32  # Records kept
+    RECORD_SIZE = 64  # Bytes per record, including the header
+
+    def __init__(
+        self,
+        level=INFO,
+        capacity=CAPACITY,
+        record_size=RECORD_SIZE,
+        echo=False,
+    ):
+        """
+        Initialize the logger.
+
+        :param level: The most detailed level to keep, as a number or a name
+            ("NONE", "ERROR", "WARN", "INFO", "DEBUG").
+        :param capacity: The number of records the ring buffer holds.
+        :param record_size: The size of each record in bytes, at most 261.
+        :param echo: Whether to print messages as well as keep them.
+        """
+        self.level = level_number(level)
+        self.capacity = capacity
+        self.record_size = record_size
+        self.buffer = bytearray(capacity * record_size)
+        self.view = memoryview(self.buffer)
+        self.echo = echo
+        self.next = 0  # Slot the next record goes in
+        self.count = 0  # Records logged since the last clear()
+
+    def log(self, level, message, *args):
+        """
+        Log a message if its level is kept.
+
+        :param level: ERROR, WARN, INFO or DEBUG.
+        :param message: The message, or a %-format string for ``args``.
+        :param args: Values to format into the message.
+        """
+        if level > self.level:
+            return
+        if args:
+            message = message % args
+        self._store(level, message)
+        if self.echo:
+            print("[%s] %s" % (LEVEL_NAMES[level], message))
+
+    def error(self, message, *args):
+        self.log(ERROR, message, *args)
+
+    def warn(self, message, *args):
+        self.log(WARN, message, *args)
+
+    def info(self, message, *args):
+        self.log(INFO, message, *args)
+
+    def debug(self, message, *args):
+        self.log(DEBUG, message, *args)
+
+    def _store(self, level, message):
+        data = message.encode()
+        length = len(data)
+        limit = self.record_size - HEADER_SIZE
+        if length > limit:
+            length = limit
+            while length and data[length] & 0xC0 == 0x80:
+                length -= 1  # Don't cut a UTF-8 character in half
+        buffer = self.buffer
+        offset = self.next * self.record_size
+        now = ticks_ms()
+        buffer[offset] = level
+        buffer[offset + 1] = length
+        for index in range(4):
+            buffer[offset + 2 + index] = (now >> (8 * index)) & 0xFF
+        start = offset + HEADER_SIZE
+        self.view[start : start + length] = memoryview(data)[:length]
+        self.next = (self.next + 1) % self.capacity
+        self.count += 1
+
+    def records(self):
+        """
+        Iterate over the kept records, oldest first.
+
+        :return: A generator of ``(ticks_ms, level, message)`` tuples.
+        """
+        kept = min(self.count, self.capacity)
+        buffer = self.buffer
+        for index in range(self.next - kept, self.next):
+            offset = (index % self.capacity) * self.record_size
+            now = 0
+            for byte in range(4):
+                now |= buffer[offset + 2 + byte] << (8 * byte)
+            start = offset + HEADER_SIZE
+            message = bytes(self.view[start : start + buffer[offset + 1]])
+            yield now, buffer[offset], message.decode()
+
+    @property
+    def dropped(self):
+        """
+        The number of records overwritten since the last clear().
+        """
+        return max(0, self.count - self.capacity)
+
+    def dump(self, clear=True):
+        """
+        Print the kept records, oldest first.
+
+        :param clear: Whether to empty the buffer afterwards.
+        """
+        if self.dropped:
+            print("[%d earlier messages dropped]" % self.dropped)
+        for now, level, message in self.records():
+            print("%d [%s] %s" % (now, LEVEL_NAMES[level], message))
+        if clear:
+            self.clear()
+
+    def clear(self):
+        """
+        Empty the ring buffer.
+        """
+        self.next = 0
+        self.count = 0
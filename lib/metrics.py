@@ -0,0 +1,144 @@
+# Description: Optional per-command latency and error counters for the
+# DFPlayer drivers. Updating them costs a couple of ticks_us() calls and a
+# few integer additions per command.
+# License: MIT
+
+from utime import ticks_us, ticks_diff
+
+
+class CommandMetrics:
+    """
+    Counters for the commands sent through a driver.
+
+    Pass an instance to a driver (``DFPlayerPro(..., metrics=CommandMetrics())``)
+    and read it from the REPL, or call ``line()`` for a compact summary.
+
+    ``commands`` maps each command (its prefix, e.g. b"AT+VOL=", or the command
+    byte for the DFPlayer Mini) to a list of
+    ``[count, timeouts, errors, total_us, max_us]``. ``histogram`` counts
+    round trips by latency, with bucket upper bounds in HISTOGRAM_BOUNDS_US.
+    """
+
+    # Upper bounds of the latency histogram buckets; the last bucket is open
+    HISTOGRAM_BOUNDS_US = (
+        1000,
+        2000,
+        5000,
+        10000,
+        20000,
+        50000,
+        100000,
+        200000,
+        500000,
+    )
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Clear all counters.
+        """
+        self.commands = {}
+        self.sent = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.histogram = [0] * (len(self.HISTOGRAM_BOUNDS_US) + 1)
+
+    def start(self):
+        """
+        :return: A timestamp to pass to ``record`` once the reply is in.
+        """
+        return ticks_us()
+
+    def record(self, key, start, bytes_sent, response, error=False):
+        """
+        Record one command round trip.
+
+        :param key: Identifies the command, e.g. its prefix.
+        :param start: The timestamp returned by ``start()``.
+        :param bytes_sent: The number of bytes written.
+        :param response: The reply, or None if the command timed out.
+        :param error: True if the device answered with an error.
+        """
+        elapsed = ticks_diff(ticks_us(), start)
+        entry = self.commands.get(key)
+        if entry is None:
+            entry = self.commands[key] = [0, 0, 0, 0, 0]
+        entry[0] += 1  # count
+        entry[3] += elapsed  # total_us
+        if elapsed > entry[4]:  # max_us
+            entry[4] = elapsed
+        self.sent += 1
+        self.bytes_sent += bytes_sent
+        if response is None:
+            entry[1] += 1  # timeouts
+            self.timeouts += 1
+        else:
+            self.bytes_received += len(response)
+            if error:
+                entry[2] += 1  # errors
+                self.errors += 1
+        bucket = 0
+        for bound in self.HISTOGRAM_BOUNDS_US:
+            if elapsed < bound:
+                break
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    @staticmethod
+    def is_error(response):
+        """
+        Check whether an AT reply is an error report rather than OK or a value.
+
+        :param response: The reply line.
+        :return: True if it starts with "error" (in any case).
+        """
+        return (
+            response is not None
+            and len(response) >= 3
+            and response[0] | 0x20 == 0x65  # e
+            and response[1] | 0x20 == 0x72  # r
+            and response[2] | 0x20 == 0x72  # r
+        )
+
+    def slowest(self):
+        """
+        :return: The key of the command with the highest average latency.
+        """
+        slowest = None
+        worst = -1
+        for key, entry in self.commands.items():
+            average = entry[3] // entry[0]
+            if average > worst:
+                slowest, worst = key, average
+        return slowest
+
+    def line(self):
+        """
+        :return: All counters as one compact line, e.g. for logging.
+        """
+        parts = [
+            "cmds=%d to=%d err=%d tx=%dB rx=%dB hist=%s"
+            % (
+                self.sent,
+                self.timeouts,
+                self.errors,
+                self.bytes_sent,
+                self.bytes_received,
+                "/".join(str(count) for count in self.histogram),
+            )
+        ]
+        for key, entry in self.commands.items():
+            if isinstance(key, bytes):
+                key = key.decode()
+            elif isinstance(key, int):
+                key = "0x%02X" % key
+            count, timeouts, errors, total_us, max_us = entry
+            parts.append(
+                "%s n=%d avg=%dus max=%dus to=%d err=%d"
+                % (key, count, total_us // count, max_us, timeouts, errors)
+            )
+        return " | ".join(parts)
@@ -0,0 +1,178 @@
+# Description: Serial frame encoder and reader for the DFPlayer Mini.
+# Commands are built in one reusable 10-byte template. Replies are read into
+# one preallocated buffer, resynchronised on the start and end bytes, checked
+# against their checksum and handed back as a memoryview as soon as a whole
+# frame has arrived.
+# License: MIT
+
+from utime import ticks_ms, ticks_diff, sleep_ms
+
+FRAME_SIZE = 10
+START_BYTE = 0x7E
+VERSION_BYTE = 0xFF
+LENGTH_BYTE = 0x06
+END_BYTE = 0xEF
+
+
+def checksum(buffer, offset=0):
+    """
+    :param buffer: Holds a frame, or at least its first seven bytes.
+    :param offset: Where the frame starts in the buffer.
+    :return: The 16-bit checksum of the version to parameter bytes.
+    """
+    total = 0
+    for i in range(offset + 1, offset + 7):
+        total += buffer[i]
+    return -total & 0xFFFF
+
+
+class FrameEncoder:
+    """
+    Build DFPlayer Mini command frames without allocating.
+
+    The start, version, length, feedback and end bytes never change, so they
+    live in a 10-byte template and their share of the checksum is worked out
+    once. ``encode`` only patches the command, parameter and checksum bytes,
+    and returns the template itself, which is overwritten by the next call.
+    """
+
+    def __init__(self, feedback=True):
+        """
+        Initialize the encoder.
+
+        :param feedback: Whether to ask the module to acknowledge commands.
+        """
+        acknowledge = 0x01 if feedback else 0x00
+        frame = self.frame = bytearray(FRAME_SIZE)
+        frame[0] = START_BYTE
+        frame[1] = VERSION_BYTE
+        frame[2] = LENGTH_BYTE
+        frame[4] = acknowledge
+        frame[9] = END_BYTE
+        # The checksum is minus the sum of bytes 1 to 6; this is the fixed part
+        self.checksum_base = -(VERSION_BYTE + LENGTH_BYTE + acknowledge)
+
+    def encode(self, command, parameter1, parameter2):
+        """
+        Fill in the template for one command.
+
+        :param command: The command byte.
+        :param parameter1: The high parameter byte.
+        :param parameter2: The low parameter byte.
+        :return: The frame, as the encoder's own bytearray.
+        """
+        frame = self.frame
+        command &= 0xFF
+        parameter1 &= 0xFF
+        parameter2 &= 0xFF
+        frame[3] = command
+        frame[5] = parameter1
+        frame[6] = parameter2
+        total = self.checksum_base - command - parameter1 - parameter2
+        total &= 0xFFFF
+        frame[7] = total >> 8
+        frame[8] = total & 0xFF
+        return frame
+
+
+class FrameReader:
+    """
+    Read 10-byte DFPlayer Mini frames from a UART without allocating.
+
+    Frames look like ``7E FF 06 cmd ack p1 p2 chk_hi chk_lo EF``. Bytes that
+    do not start a valid frame are skipped, so the reader falls back into step
+    after noise or a partial frame. ``readframe`` returns a memoryview of the
+    frame that is only valid until the next call to ``readframe`` or ``flush``.
+    """
+
+    BUFFER_SIZE = 64
+    POLL_INTERVAL_MS = 1  # Idle time between checks while waiting for data
+
+    def __init__(self, uart, size=BUFFER_SIZE):
+        """
+        Initialize the reader.
+
+        :param uart: The UART (or UART-like object) to read from.
+        :param size: The size of the receive buffer in bytes.
+        """
+        self.uart = uart
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # First byte not yet consumed
+        self.end = 0  # One past the last byte received
+
+    def flush(self):
+        """
+        Discard everything buffered or waiting in the UART.
+        """
+        self.start = self.end = 0
+        while self.uart.any():
+            self.uart.readinto(self.buffer)
+
+    def readframe(self, timeout_ms):
+        """
+        Wait for the next valid frame.
+
+        :param timeout_ms: How long to wait, in milliseconds.
+        :return: A memoryview of the 10-byte frame, or None if no valid frame
+            arrived within the timeout.
+        """
+        self._compact()
+        start_time = ticks_ms()
+        while True:
+            frame = self._find_frame()
+            if frame is not None:
+                return frame
+            waiting = self.uart.any()
+            if waiting:
+                space = len(self.buffer) - self.end
+                received = self.uart.readinto(
+                    self.view[self.end :], min(waiting, space)
+                )
+                if received:
+                    self.end += received
+                continue
+            if ticks_diff(ticks_ms(), start_time) >= timeout_ms:
+                return None
+            sleep_ms(self.POLL_INTERVAL_MS)
+
+    def _find_frame(self):
+        """
+        Skip to the next start byte and check for a complete frame there.
+
+        :return: A memoryview of the frame, or None if more bytes are needed.
+        """
+        buffer = self.buffer
+        while self.end > self.start:
+            start = self.start
+            if buffer[start] != START_BYTE:
+                self.start += 1
+                continue
+            if self.end - start < FRAME_SIZE:
+                if self.end == len(buffer):
+                    self._compact()  # Make room for the rest of the frame
+                return None
+            total = checksum(buffer, start)
+            if (
+                buffer[start + 1] == VERSION_BYTE
+                and buffer[start + 2] == LENGTH_BYTE
+                and buffer[start + 9] == END_BYTE
+                and buffer[start + 7] == total >> 8
+                and buffer[start + 8] == total & 0xFF
+            ):
+                self.start += FRAME_SIZE
+                return self.view[start : start + FRAME_SIZE]
+            self.start += 1  # Not a frame after all; resync on the next 0x7E
+        self.start = self.end = 0  # Everything was skipped
+        return None
+
+    def _compact(self):
+        """
+        Move any bytes not yet consumed to the front of the buffer.
+        """
+        if self.start:
+            remaining = self.end - self.start
+            if remaining:
+                self.buffer[:remaining] = self.view[self.start : self.end]
+            self.end = remaining
+            self.start = 0
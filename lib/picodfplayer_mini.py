@@ -1,7 +1,9 @@
 #DFPlayer mp3 player Driver using UART for Raspberry Pi Pico.
 
 from machine import UART, Pin
-from utime import sleep_ms, sleep
+from utime import sleep, ticks_ms, ticks_diff
+from miniframe import FrameEncoder, FrameReader
+from trackevents import TrackEvents
 
 #Constants
 
@@ -16,24 +18,66 @@ class DFPlayer():
     COMMAND_LENGTH = 0x06
     ACKNOWLEDGE = 0x01
     END_BYTE = 0xEF
-    COMMAND_LATENCY =   500
-
-
-    def __init__(self, uartInstance, txPin, rxPin, busyPin):
+    ACK_TIMEOUT_MS = 200 #How long to wait for the module to acknowledge a command
+    RETRIES = 2 #Extra attempts after a timeout or a transmission error
+
+    ACK_COMMAND = 0x41
+    ERROR_COMMAND = 0x40
+    #Query commands (0x42-0x4F) are answered with a data frame carrying the same command byte
+    QUERY_FIRST = 0x42
+    QUERY_LAST = 0x4F
+    #Error codes (parameter 2 of an error frame) worth sending the command again for
+    RETRY_ERRORS = (0x03, 0x04) #Serial receive error, checksum error
+    TRACK_TIMEOUT_MS = 600000 #Longest track the ...AndWait helpers will wait for
+
+    def __init__(self, uartInstance, txPin, rxPin, busyPin, metrics=None):
+        #metrics: optional CommandMetrics to record latency/timeouts/errors in
         self.playerBusy=Pin(busyPin, Pin.IN, Pin.PULL_UP)
+        #Track started/finished events from the BUSY pin, see trackevents.py
+        self.events = TrackEvents(self.playerBusy)
         self.uart = UART(uartInstance, baudrate=self.UART_BAUD_RATE, tx=Pin(txPin), rx=Pin(rxPin), bits=self.UART_BITS, parity=self.UART_PARITY, stop=self.UART_STOP)
+        self.encoder = FrameEncoder(self.ACKNOWLEDGE == 0x01)
+        self.reader = FrameReader(self.uart)
+        self.metrics = metrics
 
     def split(self, num):
         return num >> 8, num & 0xFF
 
     def sendcmd(self, command, parameter1, parameter2):
-        checksum = -(self.VERSION_BYTE + self.COMMAND_LENGTH + command + self.ACKNOWLEDGE + parameter1 + parameter2)
-        highByte, lowByte = self.split(checksum)
-        toSend = bytes([b & 0xFF for b in [self.START_BYTE, self.VERSION_BYTE, self.COMMAND_LENGTH, command, self.ACKNOWLEDGE,parameter1, parameter2, highByte, lowByte, self.END_BYTE]])
-
-        self.uart.write(toSend)
-        sleep_ms(self.COMMAND_LATENCY)
-        return self.uart.read()
+        #Patches the encoder's reusable frame; nothing is allocated per command
+        toSend = self.encoder.encode(command, parameter1, parameter2)
+
+        #A query returns its data frame rather than the ACK that may come before it
+        reply = command if self.QUERY_FIRST <= command <= self.QUERY_LAST else None
+
+        metrics = self.metrics
+        if metrics is not None:
+            start = metrics.start()
+        for attempt in range(1 + self.RETRIES):
+            self.reader.flush()
+            self.uart.write(toSend)
+            response = self.waitAck(self.ACK_TIMEOUT_MS, reply)
+            if response is not None and (response[3] != self.ERROR_COMMAND or response[6] not in self.RETRY_ERRORS):
+                break
+        if metrics is not None:
+            error = response is not None and response[3] == self.ERROR_COMMAND
+            metrics.record(command, start, len(toSend), response, error)
+        return response
+
+    def waitAck(self, timeoutMs, reply=None):
+        #Returns the ACK (0x41) or error (0x40) frame as a memoryview, valid until the next command,
+        #or None on timeout. With reply set to a query command, its data frame is returned instead
+        #of the ACK. Other frames that arrive meanwhile are skipped.
+        startTime = ticks_ms()
+        remaining = timeoutMs
+        while remaining > 0:
+            frame = self.reader.readframe(remaining)
+            if frame is None:
+                return None
+            if frame[3] == self.ERROR_COMMAND or frame[3] == (self.ACK_COMMAND if reply is None else reply):
+                return frame
+            remaining = timeoutMs - ticks_diff(ticks_ms(), startTime)
+        return None
 
     def queryBusy(self):
         return not self.playerBusy.value()
@@ -106,7 +150,23 @@ class DFPlayer():
         b = filenum & 0xff
         return self.sendcmd(0x12, a, b)#a, b)
 
+    #Play and block until the track has finished, without polling or fixed sleeps.
+    #Returns the ticks_ms() time it finished, or None if it did not start or finish in time.
+    def playTrackAndWait(self, folder, file, timeoutMs=TRACK_TIMEOUT_MS):
+        return self.events.play_and_wait(lambda: self.playTrack(folder, file), timeoutMs)
+
+    def playMP3AndWait(self, filenum, timeoutMs=TRACK_TIMEOUT_MS):
+        return self.events.play_and_wait(lambda: self.playMP3(filenum), timeoutMs)
+
     #Query System Parameters
+    #Sends a query command (0x42-0x4F), e.g. 0x43 for the volume or 0x48 for the number of files,
+    #and returns the value from its data frame, or None on timeout or an error frame.
+    def query(self, command, parameter1=0x00, parameter2=0x00):
+        response = self.sendcmd(command, parameter1, parameter2)
+        if response is None or response[3] == self.ERROR_COMMAND:
+            return None
+        return (response[5] << 8) | response[6]
+
     def init(self, params):
         self.sendcmd(0x3F, 0x00, params)
 
@@ -0,0 +1,180 @@
+# Description: Local model of the DFPlayer Pro's play position. The position
+# is read from the module once per track, then advanced with ticks_ms() and
+# moved by the driver's own play, pause and seek commands, so progress
+# displays and position triggers do not need a query round trip each time.
+# License: MIT
+
+from utime import ticks_ms, ticks_diff
+import atcommand
+
+# Commands that start a track from its beginning
+TRACK_CHANGES = (
+    atcommand.PLAYFILE,
+    atcommand.PLAYNUM,
+    atcommand.PLAY_NEXT,
+    atcommand.PLAY_LAST,
+)
+# Every command that moves the play position or changes what is playing
+COMMANDS = TRACK_CHANGES + (
+    atcommand.PLAY_PAUSE,
+    atcommand.TIME,
+    atcommand.TIME_BACK,
+    atcommand.TIME_FORWARD,
+    atcommand.DELETE,
+)
+
+
+class PlaybackClock:
+    """
+    The play position of the current track, as it should be right now.
+
+    The position is held as a position at an anchor time plus, while
+    ``playing``, the time since. ``playing`` is None and ``total_ms`` is None
+    until known. The module reports whole seconds, so a sync only moves the
+    modelled position if it has drifted outside the second the module
+    reports. When the position has stayed put (or moved) across two syncs
+    without a command in between, ``playing`` is corrected to match.
+    """
+
+    RESYNC_MS = 30000  # How often to check the model against the module
+    PAUSE_CHECK_MS = 2000  # Time between syncs that shows whether it plays
+
+    def __init__(self, resync_ms=RESYNC_MS):
+        """
+        Initialize the clock, with the position unknown.
+
+        :param resync_ms: How often sync_due() asks for a sync while the
+            position is known, in milliseconds.
+        """
+        self.resync_ms = resync_ms
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the position, so the next sync_due() is True.
+        """
+        self.anchor_ms = None  # Position at anchor_time, None if unknown
+        self.anchor_time = 0
+        self.total_ms = None  # Length of the track, None if unknown
+        self.playing = None  # None if unknown
+        self.synced_at = None  # ticks_ms() of the last sync attempt
+        self.synced_seconds = None  # Played seconds reported by that sync
+
+    def position_ms(self, now=None):
+        """
+        :param now: The ticks_ms() time to work out the position for.
+        :return: The play position in milliseconds, or None if unknown. It
+            stops at the end of the track.
+        """
+        if self.anchor_ms is None:
+            return None
+        position = self.anchor_ms
+        if self.playing:
+            if now is None:
+                now = ticks_ms()
+            position += ticks_diff(now, self.anchor_time)
+        if self.total_ms is not None and position > self.total_ms:
+            position = self.total_ms
+        return position
+
+    def sync_due(self, now=None):
+        """
+        :param now: The ticks_ms() time, if already known.
+        :return: True if the module should be asked for the position: it is
+            unknown, the track has played to its end (the module may have
+            moved on), or resync_ms has passed since the last sync.
+        """
+        if now is None:
+            now = ticks_ms()
+        synced_at = self.synced_at
+        if self.anchor_ms is None or self.total_ms is None:
+            # Unknown: sync now, unless the last attempt failed just now
+            return (
+                synced_at is None
+                or ticks_diff(now, synced_at) >= self.resync_ms
+            )
+        if ticks_diff(now, synced_at) >= self.resync_ms:
+            return True
+        return bool(self.playing) and self.position_ms(now) >= self.total_ms
+
+    def sync(self, played_seconds, total_seconds, now=None):
+        """
+        Correct the model with what the module reports.
+
+        :param played_seconds: The reply to query_played_time().
+        :param total_seconds: The reply to query_total_time().
+        :param now: The ticks_ms() time the played time was read.
+        """
+        if now is None:
+            now = ticks_ms()
+        low = played_seconds * 1000
+        if (
+            self.synced_seconds is not None
+            and ticks_diff(now, self.synced_at) >= self.PAUSE_CHECK_MS
+        ):
+            self.playing = played_seconds != self.synced_seconds
+        position = self.position_ms(now)
+        total = total_seconds * 1000
+        if position is None or self.total_ms not in (None, total):
+            position = low + 500  # No model yet, or a different track
+        elif position < low:
+            position = low
+        elif position >= low + 1000:
+            position = low + 999
+        self.total_ms = total
+        self._anchor(position, now)
+        self.synced_at = now
+        self.synced_seconds = played_seconds
+
+    def sync_failed(self, now=None):
+        """
+        Note a failed sync, so the next one waits for resync_ms.
+        """
+        self.synced_at = ticks_ms() if now is None else now
+        self.synced_seconds = None
+
+    def apply(self, prefix, argument, response, now=None):
+        """
+        Move the model for a command the driver has sent.
+
+        :param prefix: The command prefix, e.g. atcommand.TIME.
+        :param argument: The command argument, if any.
+        :param response: The reply to the command. Nothing changes on an
+            error reply, and the position becomes unknown if there was none.
+        """
+        if prefix not in COMMANDS:
+            return
+        if response is None:
+            self.reset()  # It may or may not have been carried out
+            return
+        if not atcommand.starts_with(response, b"OK"):
+            return
+        if now is None:
+            now = ticks_ms()
+        self.synced_seconds = None  # The next sync cannot judge playing
+        if prefix in TRACK_CHANGES:
+            self.total_ms = None
+            self.synced_at = None  # Read the new track's length now
+            self.playing = True
+            self._anchor(0, now)
+        elif prefix == atcommand.PLAY_PAUSE:
+            position = self.position_ms(now)
+            if self.playing is not None:
+                self.playing = not self.playing
+            self._anchor(position, now)
+        elif prefix == atcommand.DELETE:
+            self.reset()
+        elif prefix == atcommand.TIME or self.anchor_ms is not None:
+            if prefix == atcommand.TIME:
+                position = argument * 1000
+            elif prefix == atcommand.TIME_FORWARD:
+                position = self.position_ms(now) + argument * 1000
+            else:
+                position = self.position_ms(now) - argument * 1000
+            if self.total_ms is not None and position > self.total_ms:
+                position = self.total_ms
+            self._anchor(max(position, 0), now)
+
+    def _anchor(self, position, now):
+        self.anchor_ms = position
+        self.anchor_time = now
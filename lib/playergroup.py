@@ -0,0 +1,224 @@
+# Description: Concurrent control of several DFPlayer units on different
+# UARTs. A command is written to every unit first and the replies are then
+# collected together, so a group costs about one round trip instead of one
+# per unit, and the units start within microseconds of each other.
+# License: MIT
+
+from utime import ticks_us, ticks_diff, sleep_ms
+import atcommand
+
+MINI_ACK = 0x41
+MINI_ERROR = 0x40
+
+
+class PlayerGroup:
+    """
+    Several DFPlayerPro (and optionally DFPlayer Mini) instances driven as one.
+
+    Each method writes its command to every unit, then waits for all the
+    replies at once. It returns a list with one reply per unit, in the order
+    given to the constructor. A DFPlayerPro reply is its line, and a Mini
+    reply is its ACK or error frame. Each is a memoryview that stays valid
+    until that unit's next command. A reply is None if the unit timed out, or
+    if the command has no Mini equivalent and the unit is a Mini.
+
+    Retries and the batch() pipeline are not used here; a unit that times out
+    is simply reported as None.
+    """
+
+    POLL_INTERVAL_MS = 1  # Idle time between checks while replies are due
+
+    def __init__(self, players):
+        """
+        Initialize the group.
+
+        :param players: A list of DFPlayerPro and/or DFPlayer (Mini) instances,
+            each on its own UART.
+        """
+        self.players = players
+        count = len(players)
+        self.results = [None] * count
+        self.sent = [False] * count  # Whether the last command went to it
+        self.pending = [False] * count  # Still waiting for its reply
+        self.sent_at = [0] * count
+        self.sizes = [0] * count
+        self.timeouts = [0] * count
+        self.spread_us = 0  # Time between the first and last write
+
+    def _run(self, prefix, argument=None, mini=None, setting=None):
+        """
+        Send one command to every unit and collect the replies.
+
+        :param prefix: The DFPlayer Pro command prefix, e.g. atcommand.VOL.
+        :param argument: The DFPlayer Pro command argument, if any.
+        :param mini: The ``(command, parameter1, parameter2)`` for Minis, or
+            None to skip them.
+        :param setting: The DeviceState setting the command writes, so units
+            with a state cache record it.
+        :return: The list of replies.
+        """
+        players = self.players
+        results = self.results
+        pending = self.pending
+        remaining = 0
+        first = None
+        for index, player in enumerate(players):
+            results[index] = None
+            self.sent[index] = pending[index] = False
+            if hasattr(player, "router"):
+                player.router.begin_command()
+                command = player.encoder.encode(prefix, argument)
+                # Nothing is retried here, so never cut a reply short
+                self.timeouts[index] = player.latency.timeout_ms(
+                    prefix, repeatable=False
+                )
+            elif mini is not None:
+                player.reader.flush()
+                command = player.encoder.encode(*mini)
+                self.timeouts[index] = player.ACK_TIMEOUT_MS
+            else:
+                continue
+            self.sent_at[index] = now = ticks_us()
+            player.uart.write(command)
+            if first is None:
+                first = now
+            self.sizes[index] = len(command)
+            self.sent[index] = pending[index] = True
+            remaining += 1
+        self.spread_us = 0 if first is None else ticks_diff(ticks_us(), first)
+
+        while remaining:
+            waiting = False
+            for index, player in enumerate(players):
+                if not pending[index]:
+                    continue
+                reply = self._poll(player, prefix)
+                elapsed = ticks_diff(ticks_us(), self.sent_at[index])
+                if reply is None and elapsed < self.timeouts[index] * 1000:
+                    waiting = True
+                    continue
+                pending[index] = False
+                remaining -= 1
+                results[index] = reply
+                self._record(index, prefix, argument, mini, elapsed, setting)
+            if waiting:
+                sleep_ms(self.POLL_INTERVAL_MS)
+        return results
+
+    def _poll(self, player, prefix):
+        """
+        Check a unit for its reply without waiting.
+
+        :return: The reply, or None if it has not arrived yet.
+        """
+        if hasattr(player, "router"):
+            while True:
+                line = player.reader.readline(0)
+                if line is None or atcommand.is_reply(prefix, line):
+                    return line
+                player.router.publish(line)
+        while True:
+            frame = player.reader.readframe(0)
+            if frame is None or frame[3] == MINI_ACK or frame[3] == MINI_ERROR:
+                return frame
+
+    def _record(self, index, prefix, argument, mini, elapsed_us, setting):
+        """
+        Feed a unit's latency model, metrics, state cache and playback
+        clock, as its own driver would.
+        """
+        player = self.players[index]
+        reply = self.results[index]
+        metrics = player.metrics
+        if not hasattr(player, "router"):
+            if metrics is not None:
+                error = reply is not None and reply[3] == MINI_ERROR
+                start = self.sent_at[index]
+                size = self.sizes[index]
+                metrics.record(mini[0], start, size, reply, error)
+            return
+        if reply is None:
+            player.latency.record_timeout(prefix)
+            # A late reply must not be read as the next command's
+            player.router.owe(prefix, 1, player.latency.max_timeout_ms)
+        else:
+            player.latency.record(prefix, elapsed_us)
+        if metrics is not None:
+            metrics.record(
+                prefix,
+                self.sent_at[index],
+                self.sizes[index],
+                reply,
+                metrics.is_error(reply),
+            )
+        if setting is not None and player.state is not None:
+            player.state.confirm(setting, argument, reply)
+        clock = getattr(player, "clock", None)  # The full driver has one
+        if clock is not None:
+            clock.apply(prefix, argument, reply)
+
+    @property
+    def ok(self):
+        """
+        True if every unit that was sent the last command acknowledged it.
+        """
+        for index, player in enumerate(self.players):
+            if not self.sent[index]:
+                continue  # A Mini skipped for a Pro-only command
+            reply = self.results[index]
+            if reply is None:
+                return False
+            if hasattr(player, "router"):
+                if not atcommand.starts_with(reply, b"OK"):
+                    return False
+            elif reply[3] != MINI_ACK:
+                return False
+        return True
+
+    def set_volume(self, volume):
+        """
+        Set the volume on every unit.
+
+        :param volume: The volume level (0-30).
+        :return: The list of replies.
+        """
+        return self._run(atcommand.VOL, volume, (0x06, 0x00, volume), "volume")
+
+    def play_file_number(self, file_number):
+        """
+        Play a file by its number on every unit.
+
+        :param file_number: The file number to play.
+        :return: The list of replies.
+        """
+        return self._run(
+            atcommand.PLAYNUM,
+            file_number,
+            (0x03, file_number >> 8, file_number & 0xFF),
+        )
+
+    def play_specific_file(self, file_path):
+        """
+        Play a file by path on every DFPlayer Pro. Minis are skipped, as they
+        cannot play by name.
+
+        :param file_path: The path to the file to play (e.g., '/01/001.mp3').
+        :return: The list of replies.
+        """
+        return self._run(atcommand.PLAYFILE, file_path)
+
+    def play(self):
+        """
+        Toggle play/pause on every DFPlayer Pro; Minis are skipped.
+
+        :return: The list of replies.
+        """
+        return self._run(atcommand.PLAY_PAUSE)
+
+    def test_connection(self):
+        """
+        Send AT to every DFPlayer Pro; Minis are skipped.
+
+        :return: The list of replies.
+        """
+        return self._run(atcommand.AT)
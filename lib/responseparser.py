@@ -0,0 +1,171 @@
+# Description: Typed parsing of DFPlayer Pro query replies. Numbers, times,
+# play modes and file names are read straight from the reply's memoryview,
+# without building intermediate strings, and anything unexpected is reported
+# as a ResponseError that says what went wrong.
+# License: MIT
+
+from atcommand import starts_with
+
+# ResponseError reasons
+TIMEOUT = "timeout"  # No reply at all
+DEVICE_ERROR = "device error"  # The module answered with an error
+MALFORMED = "malformed"  # A reply, but not in the expected form
+
+# Play modes, as used by set_play_mode and returned by query_play_mode
+REPEAT_ONE = 1
+REPEAT_ALL = 2
+PLAY_ONCE = 3
+RANDOM = 4
+REPEAT_FOLDER = 5
+PLAY_MODES = (REPEAT_ONE, REPEAT_ALL, PLAY_ONCE, RANDOM, REPEAT_FOLDER)
+
+
+class ResponseError(Exception):
+    """
+    A query reply that could not be turned into a value.
+
+    ``reason`` is TIMEOUT, DEVICE_ERROR or MALFORMED, and ``response`` holds
+    a copy of the reply (None on timeout).
+    """
+
+    def __init__(self, reason, response=None):
+        self.reason = reason
+        self.response = None if response is None else bytes(response)
+        super().__init__(reason, self.response)
+
+
+def check(response):
+    """
+    Raise ResponseError if there is no reply or the module reported an error.
+
+    :param response: The reply line.
+    :return: The length of the reply without its CRLF terminator.
+    """
+    if response is None:
+        raise ResponseError(TIMEOUT)
+    if starts_with(response, b"err", True):
+        raise ResponseError(DEVICE_ERROR, response)
+    end = len(response)
+    if end >= 2 and response[end - 2] == 0x0D and response[end - 1] == 0x0A:
+        end -= 2
+    return end
+
+
+def read_int(response, position, end):
+    """
+    Read a run of decimal digits.
+
+    :param response: The reply line.
+    :param position: Where the digits start.
+    :param end: Where the reply's content ends.
+    :return: A ``(value, position after the digits)`` tuple.
+    """
+    start = position
+    value = 0
+    while position < end and 0x30 <= response[position] <= 0x39:
+        value = value * 10 + response[position] - 0x30
+        position += 1
+    if position == start:
+        raise ResponseError(MALFORMED, response)
+    return value, position
+
+
+def parse_int(response):
+    """
+    Parse a bare number reply, e.g. "12" for AT+QUERY=2.
+
+    :return: The number.
+    """
+    end = check(response)
+    value, position = read_int(response, 0, end)
+    if position != end:
+        raise ResponseError(MALFORMED, response)
+    return value
+
+
+def parse_bracketed(response, label):
+    """
+    Parse a reply of the form LABEL=[n], e.g. "VOL=[15]".
+
+    :param label: The expected start, e.g. b"VOL=".
+    :return: The number.
+    """
+    end = check(response)
+    position = len(label)
+    if not starts_with(response, label) or position >= end:
+        raise ResponseError(MALFORMED, response)
+    bracketed = response[position] == 0x5B  # "["
+    if bracketed:
+        position += 1
+    value, position = read_int(response, position, end)
+    if bracketed:
+        if position >= end or response[position] != 0x5D:  # "]"
+            raise ResponseError(MALFORMED, response)
+        position += 1
+    if position != end:
+        raise ResponseError(MALFORMED, response)
+    return value
+
+
+def parse_volume(response):
+    """
+    Parse the reply to AT+VOL=?.
+
+    :return: The volume, 0-30.
+    """
+    return parse_bracketed(response, b"VOL=")
+
+
+def parse_play_mode(response):
+    """
+    Parse the reply to AT+PLAYMODE=?.
+
+    :return: One of PLAY_MODES.
+    """
+    mode = parse_bracketed(response, b"PLAYMODE=")
+    if mode not in PLAY_MODES:
+        raise ResponseError(MALFORMED, response)
+    return mode
+
+
+def parse_seconds(response):
+    """
+    Parse a time reply, given either in seconds ("83") or as minutes and
+    seconds, optionally with hours ("1:23", "0:01:23").
+
+    :return: The time in seconds.
+    """
+    end = check(response)
+    seconds, position = read_int(response, 0, end)
+    while position < end:
+        if response[position] != 0x3A:  # ":"
+            raise ResponseError(MALFORMED, response)
+        field, position = read_int(response, position + 1, end)
+        seconds = seconds * 60 + field
+    return seconds
+
+
+def parse_file_name(response):
+    """
+    Parse the reply to AT+QUERY=5, a UTF-16LE file name.
+
+    MicroPython has no UTF-16 codec, so the code units are decoded here.
+
+    :return: The file name.
+    """
+    end = check(response)
+    if end % 2:
+        raise ResponseError(MALFORMED, response)
+    chars = []
+    position = 0
+    while position < end:
+        unit = response[position] | response[position + 1] << 8
+        position += 2
+        if 0xD800 <= unit < 0xDC00 and position < end:
+            low = response[position] | response[position + 1] << 8
+            if 0xDC00 <= low < 0xE000:
+                unit = 0x10000 + ((unit - 0xD800) << 10) + (low - 0xDC00)
+                position += 2
+        if unit:
+            chars.append(chr(unit))
+    return "".join(chars)
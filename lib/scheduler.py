@@ -0,0 +1,163 @@
+# Description: Priority scheduling of DFPlayer Pro commands. Playback is
+# sent at once, while control and background commands wait in queues that
+# are drained one command per main loop pass, so a sound never waits behind
+# a backlog of fade steps or status queries. Background commands that have
+# been superseded are merged or dropped before they cost a round trip.
+# License: MIT
+
+from utime import ticks_ms, ticks_diff
+
+# Priority classes, most urgent first
+PLAYBACK = 0  # Sent straight away, e.g. play_specific_file
+CONTROL = 1  # Settings the user asked for, e.g. set_play_mode
+BACKGROUND = 2  # Fade steps, status polling, ...
+CLASSES = (PLAYBACK, CONTROL, BACKGROUND)
+
+
+class CommandScheduler:
+    """
+    Queue DFPlayer Pro commands by priority in front of the driver.
+
+    The driver sends one command at a time and waits for its reply, so the
+    longest a playback command waits is the one command already in flight:
+    one device turnaround. ``update()`` sends at most one queued command, the
+    oldest of the most urgent class, so the main loop is never held up by
+    more than one round trip either.
+
+    A command submitted with a ``merge`` key replaces a queued command with
+    the same key, keeping its place in the queue: a fade step supersedes the
+    one before it, and a repeated query is only sent once. The callback of
+    the replaced command is not called. Background commands that have waited
+    longer than ``stale_ms`` are dropped.
+
+    ``depth`` is the number of queued commands. ``wait_ms`` and
+    ``max_wait_ms`` are the last and longest time a command spent queued,
+    and ``merged`` and ``dropped`` count the commands that were never sent.
+    """
+
+    STALE_MS = 2000  # Background commands older than this are dropped
+
+    def __init__(self, player, stale_ms=STALE_MS):
+        """
+        Initialize the scheduler.
+
+        :param player: The DFPlayerPro instance commands are sent through.
+        :param stale_ms: How long a background command may wait before it is
+            dropped, in milliseconds.
+        """
+        self.player = player
+        self.stale_ms = stale_ms
+        # One queue per class; entries are [method, args, merge, callback,
+        # submitted_at]
+        self.queues = ([], [], [])
+        self.sent = 0
+        self.merged = 0
+        self.dropped = 0
+        self.wait_ms = 0
+        self.max_wait_ms = 0
+
+    @property
+    def depth(self):
+        """
+        The number of commands waiting to be sent.
+        """
+        return sum(len(queue) for queue in self.queues)
+
+    def submit(self, priority, method, args=(), merge=None, callback=None):
+        """
+        Queue a command, or send it now if it is PLAYBACK.
+
+        :param priority: PLAYBACK, CONTROL or BACKGROUND.
+        :param method: The player method to call, e.g. player.set_volume.
+        :param args: The arguments for the method, as a tuple.
+        :param merge: A key that identifies what the command sets or asks,
+            e.g. "volume", so a later command with the same key replaces it.
+        :param callback: Called as ``callback(result)`` with what the method
+            returned, once the command has been sent.
+        :return: The method's result for PLAYBACK, otherwise None.
+        """
+        if priority == PLAYBACK:
+            return self._send([method, args, merge, callback, ticks_ms()])
+        queue = self.queues[priority]
+        if merge is not None:
+            for entry in queue:
+                if entry[2] == merge:
+                    entry[0] = method
+                    entry[1] = args
+                    entry[3] = callback
+                    self.merged += 1
+                    return None
+        queue.append([method, args, merge, callback, ticks_ms()])
+        return None
+
+    def play(self, method, *args):
+        """
+        Send a playback command now, ahead of everything queued.
+
+        :param method: The player method to call, e.g.
+            player.play_specific_file.
+        :return: What the method returned.
+        """
+        return self.submit(PLAYBACK, method, args)
+
+    def cancel(self, merge):
+        """
+        Drop the queued command with a merge key, e.g. when a fade is
+        cancelled.
+
+        :param merge: The merge key given to submit().
+        :return: True if a command was dropped.
+        """
+        for queue in self.queues:
+            for index, entry in enumerate(queue):
+                if entry[2] == merge:
+                    del queue[index]
+                    self.dropped += 1
+                    return True
+        return False
+
+    def update(self):
+        """
+        Send the next queued command: the oldest CONTROL command, or else the
+        oldest BACKGROUND command that is not stale.
+
+        :return: True while commands are still queued.
+        """
+        background = self.queues[BACKGROUND]
+        now = ticks_ms()
+        while background and (
+            ticks_diff(now, background[0][4]) > self.stale_ms
+        ):
+            background.pop(0)
+            self.dropped += 1
+        for queue in self.queues:
+            if queue:
+                self._send(queue.pop(0))
+                break
+        return self.depth > 0
+
+    def _send(self, entry):
+        method, args, _, callback, submitted_at = entry
+        wait_ms = ticks_diff(ticks_ms(), submitted_at)
+        self.wait_ms = wait_ms
+        if wait_ms > self.max_wait_ms:
+            self.max_wait_ms = wait_ms
+        result = method(*args)
+        self.sent += 1
+        if callback is not None:
+            callback(result)
+        return result
+
+    def line(self):
+        """
+        :return: The queue depth and wait times as one compact line, e.g. for
+            logging.
+        """
+        return "depth=%d sent=%d merged=%d dropped=%d wait=%dms max=%dms" % (
+            self.depth,
+            self.sent,
+            self.merged,
+            self.dropped,
+            self.wait_ms,
+            self.max_wait_ms,
+        )
@@ -0,0 +1,133 @@
+# Description: Back-to-back playback of queued clips on the DFPlayer Pro.
+# The length of the playing track is asked for once, its end is predicted
+# from ticks_ms(), and the next clip is sent just early enough for the
+# module to start it as the last one ends, with no polling in between.
+# License: MIT
+
+from utime import ticks_ms, ticks_diff, ticks_add
+from responseparser import ResponseError
+import atcommand
+
+
+class TrackSequencer:
+    """
+    Play a queue of files (paths) and track numbers one after the other.
+
+    Call ``update()`` on every pass of the main loop. The length of the
+    playing track is only queried once something is queued behind it, so
+    starting a lone clip with ``play()`` costs a single command.
+
+    The module reports whole seconds, so a track's end is predicted as its
+    start, plus the reported length, plus ``tail_ms`` for the part of a
+    second that was left out. The next command is sent early by the learned
+    round trip of the play command, so it takes effect as the track ends.
+
+    Set the module's play mode to responseparser.PLAY_ONCE, so it does not
+    move on to a track of its own choosing in the meantime.
+    """
+
+    TAIL_MS = 500  # Added to the reported length, which is whole seconds
+    RETRY_MS = 1000  # Wait before asking again when a length query fails
+
+    def __init__(self, player, tail_ms=TAIL_MS):
+        """
+        Initialize the sequencer.
+
+        :param player: The DFPlayerPro instance to play on.
+        :param tail_ms: Added to each track's reported length, in
+            milliseconds.
+        """
+        self.player = player
+        self.tail_ms = tail_ms
+        self.queue = []
+        self.current = None  # The track last started by the sequencer
+        self.started_at = 0  # ticks_ms() when its play command was answered
+        self.ends_at = None  # Its predicted end, once the length is known
+        self.query_at = 0  # When its length may be queried
+
+    def add(self, track):
+        """
+        Queue a track to play after the ones already queued.
+
+        :param track: A file path (str), or a file number (int).
+        """
+        self.queue.append(track)
+
+    def play(self, track):
+        """
+        Clear the queue and play a track now.
+
+        :param track: A file path (str), or a file number (int).
+        :return: The response to the play command.
+        """
+        self.clear()
+        return self._start(track)
+
+    def clear(self):
+        """
+        Drop the queued tracks; the one playing carries on.
+        """
+        del self.queue[:]
+
+    def _start(self, track):
+        player = self.player
+        if isinstance(track, int):
+            response = player.play_file_number(track)
+        else:
+            response = player.play_specific_file(track)
+        self.current = track
+        self.started_at = self.query_at = ticks_ms()
+        self.ends_at = None
+        return response
+
+    def _predict(self):
+        """
+        Query the playing track's length and predict its end.
+
+        :return: True if the end is now known.
+        """
+        try:
+            seconds = self.player.query_total_time()
+        except ResponseError:
+            seconds = None  # The full driver raises; the simple one logs
+        if seconds is None:
+            self.query_at = ticks_add(ticks_ms(), self.RETRY_MS)
+            return False
+        self.ends_at = ticks_add(
+            self.started_at, seconds * 1000 + self.tail_ms
+        )
+        return True
+
+    def remaining_ms(self):
+        """
+        :return: The time left until the playing track's predicted end, or
+            None if it has not been predicted.
+        """
+        if self.ends_at is None:
+            return None
+        return max(0, ticks_diff(self.ends_at, ticks_ms()))
+
+    def update(self):
+        """
+        Start the next queued track if the playing one is about to end.
+
+        :return: True while tracks are still queued.
+        """
+        if not self.queue:
+            return False
+        if self.current is not None:
+            if self.ends_at is None:
+                if ticks_diff(ticks_ms(), self.query_at) < 0:
+                    return True
+                if not self._predict():
+                    return True
+            command = (
+                atcommand.PLAYNUM
+                if isinstance(self.queue[0], int)
+                else atcommand.PLAYFILE
+            )
+            lead = self.player.latency.average_ms(command)
+            if ticks_diff(ticks_add(ticks_ms(), lead), self.ends_at) < 0:
+                return True
+        self._start(self.queue.pop(0))
+        return bool(self.queue)
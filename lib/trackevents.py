@@ -0,0 +1,158 @@
+# Description: Track start and finish events from the DFPlayer Mini's BUSY
+# pin. Both edges are timestamped in the pin IRQ, so callers can wait for a
+# track to end (or be called back when it does) instead of polling the pin or
+# sleeping for a guessed track length.
+# License: MIT
+
+from machine import Pin, idle
+from micropython import schedule
+from utime import ticks_ms, ticks_diff
+
+STARTED = 1
+FINISHED = 2
+
+
+class TrackEvents:
+    """
+    Watch a DFPlayer Mini BUSY pin, which is low while a track plays.
+
+    ``starts`` and ``finishes`` count the edges seen, and ``started_at`` and
+    ``finished_at`` hold the ticks_ms() time of the latest of each. Set
+    ``on_started`` or ``on_finished`` to a function taking that time to be
+    called back; callbacks run via micropython.schedule, outside the IRQ.
+    """
+
+    START_TIMEOUT_MS = 1000  # How long a play command may take to start
+
+    def __init__(self, busy_pin):
+        """
+        Initialize the watcher and arm the pin interrupt.
+
+        :param busy_pin: The Pin instance connected to BUSY, set up as an input.
+        """
+        self.pin = busy_pin
+        self.starts = 0 if busy_pin.value() else 1  # Already playing counts
+        self.finishes = 0
+        self.started_at = None
+        self.finished_at = None
+        self.on_started = None
+        self.on_finished = None
+        self.flag = None  # asyncio.ThreadSafeFlag, created on first await
+        self.dispatch = self._dispatch  # Bound once; the IRQ must not allocate
+        busy_pin.irq(
+            handler=self._edge, trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING
+        )
+
+    def _edge(self, pin):
+        # Runs in interrupt context: only store ints, no allocation
+        now = ticks_ms()
+        if pin.value():
+            if self.finishes == self.starts:
+                return  # Bounce, or already seen
+            self.finishes += 1
+            self.finished_at = now
+            callback = self.on_finished
+            kind = FINISHED
+        else:
+            if self.starts != self.finishes:
+                return
+            self.starts += 1
+            self.started_at = now
+            callback = self.on_started
+            kind = STARTED
+        if self.flag is not None:
+            self.flag.set()
+        if callback is not None:
+            schedule(self.dispatch, kind)
+
+    def _dispatch(self, kind):
+        if kind == STARTED:
+            if self.on_started is not None:
+                self.on_started(self.started_at)
+        elif self.on_finished is not None:
+            self.on_finished(self.finished_at)
+
+    def is_playing(self):
+        """
+        :return: True while the BUSY pin says a track is playing.
+        """
+        return not self.pin.value()
+
+    def wait_started(self, starts, timeout_ms=START_TIMEOUT_MS):
+        """
+        Wait for a track to start.
+
+        :param starts: The value of ``starts`` before the play command.
+        :param timeout_ms: How long to wait, in milliseconds.
+        :return: The ticks_ms() time it started, or None on timeout.
+        """
+        start_time = ticks_ms()
+        while self.starts == starts:
+            if ticks_diff(ticks_ms(), start_time) >= timeout_ms:
+                return None
+            idle()  # Sleep until the next interrupt
+        return self.started_at
+
+    def wait_finished(self, finishes, timeout_ms):
+        """
+        Wait for a track to finish.
+
+        :param finishes: The value of ``finishes`` before the play command.
+        :param timeout_ms: How long to wait, in milliseconds.
+        :return: The ticks_ms() time it finished, or None on timeout.
+        """
+        start_time = ticks_ms()
+        while self.finishes == finishes:
+            if ticks_diff(ticks_ms(), start_time) >= timeout_ms:
+                return None
+            idle()
+        return self.finished_at
+
+    def play_and_wait(self, play, timeout_ms):
+        """
+        Start a track and block until it has finished.
+
+        :param play: A function that sends the play command.
+        :param timeout_ms: The longest the track may take, in milliseconds.
+        :return: The ticks_ms() time it finished, or None if it did not start
+            or did not finish in time.
+        """
+        starts = self.starts
+        finishes = self.finishes
+        play()
+        if self.wait_started(starts) is None and not self.is_playing():
+            return None  # If still playing, the new track started without an edge
+        return self.wait_finished(finishes, timeout_ms)
+
+    async def started(self, starts):
+        """
+        Await the start of a track, for use with uasyncio.
+
+        :param starts: The value of ``starts`` before the play command.
+        :return: The ticks_ms() time it started.
+        """
+        flag = self._flag()
+        while self.starts == starts:
+            await flag.wait()
+        return self.started_at
+
+    async def finished(self, finishes):
+        """
+        Await the end of a track, for use with uasyncio.
+
+        :param finishes: The value of ``finishes`` before the play command.
+        :return: The ticks_ms() time it finished.
+        """
+        flag = self._flag()
+        while self.finishes == finishes:
+            await flag.wait()
+        return self.finished_at
+
+    def _flag(self):
+        if self.flag is None:
+            try:
+                import uasyncio as asyncio
+            except ImportError:
+                import asyncio
+            self.flag = asyncio.ThreadSafeFlag()
+        return self.flag
@@ -1,7 +1,13 @@
-from time import sleep
+from utime import sleep_ms
 from machine import Pin
 from dfplayerpro import DFPlayerPro
 from secretgame import SecretGame
+from buttons import ButtonEvents, PRESS, RELEASE, CHORD
+from fader import VolumeFader
+from scheduler import CommandScheduler
+from bootprofile import BootProfile
+from logger import Logger, ERROR, WARN, INFO, DEBUG
+import autobaud
 
 # Constants. Change these if DFPlayer is connected to other pins.
 UART_INSTANCE = 1
@@ -13,149 +19,134 @@ GPIO_ESPRESSO = 2
 # Default volume
 DEFAULT_VOLUME = 8  # Max 30
 
-# Debounce delay for button presses
-DEBOUNCE_DELAY = 0.3  # 0.3 seconds
+# How long the fade-out takes when a button is released
+FADE_DURATION_MS = 1000
+
+# Idle time between passes of the main loop
+LOOP_DELAY_MS = 5
 
 # Logging levels
 LOG_LEVEL = "DEBUG"  # Options: "NONE", "ERROR", "WARN", "INFO", "DEBUG"
+# Print messages as they are logged. Without a USB host attached, print can
+# stall the main loop; messages are kept in RAM either way, see logger.dump()
+LOG_ECHO = False
 
+# Shared with the DFPlayer driver
+logger = Logger(LOG_LEVEL, echo=LOG_ECHO)
+log = logger.log
 
-def log(level, message):
-    """
-    Log a message if the level is equal to or higher than the current LOG_LEVEL.
-    """
-    levels = {"NONE": -1, "ERROR": 0, "WARN": 1, "INFO": 2, "DEBUG": 3}
-    if levels[level] <= levels[LOG_LEVEL]:
-        print(f"[{level}] {message}")
-
-
-def validate_response(response, success_message, failure_message):
-    """
-    Validate the response from the DFPlayer and log the appropriate message.
-
-    :param response: The response from the DFPlayer command.
-    :param success_message: The message to log if the response is valid.
-    :param failure_message: The message to log if the response is invalid.
-    :return: True if the response is valid, False otherwise.
-    """
-    if response and b"OK" in response:
-        log("INFO", success_message)
-        return True
-    else:
-        log("WARN", f"{failure_message}: {response}")
-        return False
-
-
-log("INFO", "Starting up...")
+log(INFO, "Starting up...")
 
 # Create player instance with error handling
 try:
-    player = DFPlayerPro(UART_INSTANCE, TX_PIN, RX_PIN)
-    response = player.test_connection()
-    if not validate_response(
-        response,
-        "DFPlayer connected successfully",
-        "DFPlayer not responding or invalid response",
-    ):
+    player = DFPlayerPro(
+        UART_INSTANCE, TX_PIN, RX_PIN, cache=True, logger=logger
+    )
+    # Finds the DFPlayer's baud rate (the one stored last boot is tried first)
+    baud_rate = autobaud.negotiate(player)
+    if baud_rate:
+        log(INFO, "DFPlayer connected successfully at %d baud", baud_rate)
+    else:
+        log(WARN, "DFPlayer not responding at any baud rate")
         player = None  # Set player to None to handle gracefully later
 except Exception as e:
-    log("ERROR", f"Failed to initialize DFPlayer: {e}")
+    log(ERROR, "Failed to initialize DFPlayer: %s", e)
     player = None
 
-# Disable the prompt tone to stop "music" on startup
+# Disable the prompt tone to stop "music" on startup, and set the volume.
+# Only settings changed since the last boot are sent, all in one burst, and
+# the replies are checked from the main loop.
+boot = None
 if player:
-    response = player.set_prompt_tone("OFF")
-    validate_response(
-        response, "Prompt tone disabled", "Failed to disable prompt tone"
+    boot = BootProfile(
+        player, (("prompt_tone", "OFF"), ("volume", DEFAULT_VOLUME))
     )
+    sent = boot.start()
+    log(DEBUG, "Sent %d startup setting commands", sent)
 
 # Configure GPIO_FROTHER and GPIO_ESPRESSO as inputs with pull-up resistors
 button_frother = Pin(GPIO_FROTHER, Pin.IN, Pin.PULL_UP)
 button_espresso = Pin(GPIO_ESPRESSO, Pin.IN, Pin.PULL_UP)
 
-# Set volume globally
-if player:
-    response = player.set_volume(DEFAULT_VOLUME)
-    validate_response(
-        response, f"Volume set to {DEFAULT_VOLUME}", "Failed to set volume"
-    )
-
 # Set the filenames to play
 FILE_FROTHER = "/01/FROTHER.MP3"  # Frother
 FILE_ESPRESSO = "/01/ESPRESSO.MP3"  # Espresso
 
-# Initialize SecretGame
-secret_game = SecretGame(player, button_frother, button_espresso, log)
+# Button indices, in the order the pins are given to ButtonEvents
+FROTHER = 0
+ESPRESSO = 1
+BUTTON_NAMES = ("frother", "espresso")
+BUTTON_FILES = (FILE_FROTHER, FILE_ESPRESSO)
+
+# Debounced press, release and chord events from both buttons
+buttons = ButtonEvents((button_frother, button_espresso))
+
+# Initialize SecretGame (frother is its left button, espresso its right)
+secret_game = SecretGame(player, log)
+
+# Volume fades run in the background of the main loop; their steps queue
+# behind playback, which is sent straight away
+scheduler = CommandScheduler(player)
+fader = VolumeFader(player, scheduler)
 
 # Main loop
 is_playing = False
 current_file = None
-frother_pressed = False
-espresso_pressed = False
 
 try:
-    log("INFO", "Entering main loop...")
+    log(INFO, "Entering main loop...")
     while True:
         if player is None:
-            log("ERROR", "DFPlayer is not initialized. Exiting loop.")
+            log(ERROR, "DFPlayer is not initialized. Exiting loop.")
             break
 
-        if not secret_game.in_game_mode:  # Not in game mode
-            if (
-                not button_frother.value() and not button_espresso.value()
-            ):  # Both buttons pressed
+        buttons.poll()
+        event = buttons.get()
+        while event is not None:
+            kind, button, ticks = event
+            if secret_game.in_game_mode:
+                secret_game.handle_event(kind, button, ticks)
+            elif kind == CHORD:  # Both buttons pressed
+                fader.cancel()
                 secret_game.enter_game_mode()
-            else:
-                # Frother button logic with logging
-                if not button_frother.value():  # Frother button pressed
-                    if not frother_pressed:
-                        frother_pressed = True
-                        sleep(DEBOUNCE_DELAY)  # Use debounce delay
-                        if not button_frother.value():  # Confirm stable press
-                            if not is_playing or current_file != FILE_FROTHER:
-                                log(
-                                    "INFO",
-                                    f"Playing frother file: {FILE_FROTHER}",
-                                )
-                                player.play_specific_file(FILE_FROTHER)
-                                player.set_volume(
-                                    DEFAULT_VOLUME
-                                )  # Set volume to 10
-                                is_playing = True
-                else:
-                    frother_pressed = False
-
-                # Espresso button logic with logging
-                if not button_espresso.value():  # Espresso button pressed
-                    if not espresso_pressed:
-                        espresso_pressed = True
-                        sleep(DEBOUNCE_DELAY)  # Use debounce delay
-                        if not button_espresso.value():  # Confirm stable press
-                            if not is_playing or current_file != FILE_ESPRESSO:
-                                log(
-                                    "INFO",
-                                    f"Playing espresso file: {FILE_ESPRESSO}",
-                                )
-                                player.play_specific_file(FILE_ESPRESSO)
-                                player.set_volume(
-                                    DEFAULT_VOLUME
-                                )  # Set volume to 10
-                                is_playing = True
-                else:
-                    espresso_pressed = False
-
-                # Fade-out logic
-                if (
-                    not frother_pressed and not espresso_pressed
-                ):  # No button pressed
+                is_playing = False  # The game takes over the player
+            elif kind == PRESS:
+                file_path = BUTTON_FILES[button]
+                if not is_playing or current_file != file_path:
+                    log(
+                        INFO,
+                        "Playing %s file: %s",
+                        BUTTON_NAMES[button],
+                        file_path,
+                    )
+                    fader.cancel()  # A new sound beats the fade
+                    secret_game.sequencer.clear()  # And a game sound
+                    with player.batch() as batch:
+                        batch.play_specific_file(file_path)
+                        batch.set_volume(DEFAULT_VOLUME)
+                    is_playing = True
+                    current_file = file_path
+            elif kind == RELEASE:
+                # Fade-out once no button is pressed
+                if not (
+                    buttons.is_pressed(FROTHER) or buttons.is_pressed(ESPRESSO)
+                ):
                     if is_playing:
-                        for vol in range(DEFAULT_VOLUME, -1, -2):
-                            response = player.set_volume(vol)
-                        player.set_volume(0)  # Mute, just to be sure
+                        fader.start(0, FADE_DURATION_MS, DEFAULT_VOLUME)
                         is_playing = False  # Mark playback as stopped
-        else:  # In game mode
-            secret_game.handle_game_mode()
+            event = buttons.get()
+
+        if boot is not None and not boot.update():
+            if boot.ok:
+                log(INFO, "Startup settings confirmed")
+            else:
+                log(WARN, "Startup settings not confirmed")
+            boot = None
+        secret_game.update()  # Check the sequence once the buttons go idle
+        fader.update()  # Queue the next fade step, if one is due
+        scheduler.update()  # Send the most urgent queued command
 
-        sleep(0.1)
+        sleep_ms(LOOP_DELAY_MS)
 except KeyboardInterrupt:
-    log("WARN", "KeyboardInterrupt detected, exiting program")
+    log(WARN, "KeyboardInterrupt detected, exiting program")
+    logger.dump()  # Someone is at the REPL, so print what was logged
@@ -1,10 +1,28 @@
-from time import sleep
+from utime import ticks_ms, ticks_diff
+from buttons import PRESS, RELEASE, CHORD
+from sequencer import TrackSequencer
+from logger import INFO
+from gestures import (
+    GestureMatcher,
+    TAP_LEFT,
+    TAP_RIGHT,
+    HOLD_LEFT,
+    HOLD_RIGHT,
+    BOTH,
+)
 
 # Folder prefix for all file paths
 FOLDER_PREFIX = "/02/"
 
-# Debounce delay for button presses
-DEBOUNCE_DELAY = 0.3  # 0.3 seconds
+# Button indices, in the order the pins are given to ButtonEvents
+LEFT = 0
+RIGHT = 1
+
+# A press held at least this long is a long press
+LONG_PRESS_MS = 600
+
+# The sequence is checked once no button has been touched for this long
+COMMIT_TIMEOUT_MS = 2000
 
 # Fixed startup and fail sounds
 STARTUP_SOUND = "ST-MARIO.MP3"
@@ -13,6 +31,10 @@ FAIL_SOUND = "NO-MARIO.MP3"
 # Mystery game volume
 GAME_VOLUME = 5  # Max 30
 
+# Patterns are made of gesture symbols: "L" and "R" for a tap on the left or
+# right button, "<" and ">" for a long press on the left or right button, and
+# "+" for both buttons together. Pressing both buttons checks the sequence
+# unless a pattern continues with "+".
 MYSTERY_SOUNDS = {
     # 1-character patterns (2 sounds)
     "L": "TM-SOOTY.MP3",
@@ -50,46 +72,50 @@ MYSTERY_SOUNDS = {
     "RRRR": "TM-NEIGH.MP3",
 }
 
-# Maximum valid sequence length
-MAX_SEQUENCE_LENGTH = max(len(seq) for seq in MYSTERY_SOUNDS.keys())
+# Compiled once; shared by every SecretGame
+MATCHER = GestureMatcher(MYSTERY_SOUNDS)
 
 
 class SecretGame:
-    def __init__(self, player, button_left, button_right, log_func):
+    def __init__(self, player, log_func):
         """
         Initialize the SecretGame class.
 
         :param player: DFPlayerPro instance for playing sounds.
-        :param button_left: Pin instance for the left button.
-        :param button_right: Pin instance for the right button.
-        :param log_func: Logging function for debug output.
+        :param log_func: Logging function, called as
+            ``log_func(level, message, *args)``, e.g. a Logger's log method.
         """
         self.player = player
-        self.button_left = button_left
-        self.button_right = button_right
         self.log = log_func
-        self.sequence = []
+        # Beeps go through the sequencer, so a result sound can follow one
+        self.sequencer = TrackSequencer(player)
+        self.matcher = MATCHER
+        self.held_since = [None, None]  # ticks_ms() of each button's press
+        self.last_event = 0  # ticks_ms() of the last button event
         self.in_game_mode = False
 
     def enter_game_mode(self):
         """
         Enter game mode when both buttons are pressed simultaneously.
         """
-        self.log("INFO", "Entering game mode")
-
-        self.player.play_specific_file(
-            FOLDER_PREFIX + STARTUP_SOUND
-        )  # Play startup sound
-        self.player.set_volume(GAME_VOLUME)
-        self.sequence = []
+        self.log(INFO, "Entering game mode")
+        self.sequencer.clear()  # A result sound still due from the last game
+
+        with self.player.batch() as batch:
+            batch.play_specific_file(
+                FOLDER_PREFIX + STARTUP_SOUND
+            )  # Play startup sound
+            batch.set_volume(GAME_VOLUME)
+        self.matcher.reset()
+        self.held_since[LEFT] = self.held_since[RIGHT] = None
+        self.last_event = ticks_ms()
         self.in_game_mode = True
-        sleep(DEBOUNCE_DELAY)
 
     def exit_game_mode(self):
         """
         Exit game mode when both buttons are pressed again.
         """
-        self.log("INFO", "Exiting game mode")
+        self.log(INFO, "Exiting game mode")
         self.in_game_mode = False
 
     def exit_game_with_fail(self, reason, sequence_str=""):
@@ -99,58 +125,99 @@ class SecretGame:
         :param reason: The reason for exiting the game mode.
         :param sequence_str: The sequence that caused the failure (optional).
         """
-        self.log("INFO", f"Exiting game mode due to: {reason}")
+        self.log(INFO, "Exiting game mode due to: %s", reason)
         if sequence_str:
-            self.log("INFO", f"Sequence that failed: {sequence_str}")
-        self.player.play_specific_file(
-            FOLDER_PREFIX + FAIL_SOUND
-        )  # Play fail sound
+            self.log(INFO, "Sequence that failed: %s", sequence_str)
+        self.sequencer.add(FOLDER_PREFIX + FAIL_SOUND)  # After the beep
         self.exit_game_mode()
 
-    def handle_game_mode(self):
+    def handle_event(self, kind, button, ticks):
+        """
+        Handle a button event in game mode.
+
+        Taps and long presses are told apart when the button is released, so
+        the gesture is stepped then; the beep plays on the press.
+
+        :param kind: PRESS, RELEASE or CHORD, from the buttons module.
+        :param button: LEFT or RIGHT.
+        :param ticks: The ticks_ms() time of the event.
         """
-        Handle button presses in game mode.
+        self.last_event = ticks
+        if kind == PRESS:
+            self.held_since[button] = ticks
+            if button == LEFT:
+                self.log(INFO, "Left button pressed in game mode")
+                self.sequencer.play(FOLDER_PREFIX + "BEEP1.MP3")  # Play beep
+            else:
+                self.log(INFO, "Right button pressed in game mode")
+                self.sequencer.play(FOLDER_PREFIX + "BEEP2.MP3")  # Play boop
+        elif kind == CHORD:  # Both buttons pressed
+            self.log(INFO, "Both buttons pressed in game mode")
+            # The presses that made up the chord are not gestures of their own
+            self.held_since[LEFT] = self.held_since[RIGHT] = None
+            if self.matcher.can_step(BOTH):
+                self.step(BOTH)
+            else:
+                self.check_sequence()
+        elif kind == RELEASE:
+            pressed_at = self.held_since[button]
+            if pressed_at is None:
+                return  # Part of a chord, or pressed before the game started
+            self.held_since[button] = None
+            held_ms = ticks_diff(ticks, pressed_at)
+            if button == LEFT:
+                symbol = HOLD_LEFT if held_ms >= LONG_PRESS_MS else TAP_LEFT
+            else:
+                symbol = HOLD_RIGHT if held_ms >= LONG_PRESS_MS else TAP_RIGHT
+            self.step(symbol)
+
+    def step(self, symbol):
         """
-        if (
-            not self.button_left.value() and not self.button_right.value()
-        ):  # Both buttons pressed
-            self.log("INFO", "Both buttons pressed in game mode")
-            self.check_sequence()
-            sleep(DEBOUNCE_DELAY)
-        elif not self.button_left.value():
-            self.log("INFO", "Left button pressed in game mode")
-            self.sequence.append("L")
-            self.player.play_specific_file(
-                FOLDER_PREFIX + "BEEP1.MP3"
-            )  # Play beep
-            sleep(DEBOUNCE_DELAY)
-        elif not self.button_right.value():
-            self.log("INFO", "Right button pressed in game mode")
-            self.sequence.append("R")
-            self.player.play_specific_file(
-                FOLDER_PREFIX + "BEEP2.MP3"
-            )  # Play boop
-            sleep(DEBOUNCE_DELAY)
-
-        # Check if the sequence exceeds the maximum valid length
-        if len(self.sequence) > MAX_SEQUENCE_LENGTH:
+        Add a gesture to the sequence, failing as soon as no pattern can
+        match and checking as soon as no longer pattern can.
+
+        :param symbol: The gesture symbol, e.g. TAP_LEFT.
+        """
+        if not self.matcher.step(symbol):
             self.exit_game_with_fail(
-                "Sequence exceeded maximum length", "".join(self.sequence)
+                "No pattern matches", self.matcher.sequence(symbol)
             )
+        elif self.matcher.is_leaf():
+            self.check_sequence()
+
+    def update(self):
+        """
+        Check the sequence if the buttons have been left alone for
+        COMMIT_TIMEOUT_MS, and start a queued sound once the beep before it
+        has finished. Call this on every pass of the main loop.
+        """
+        self.sequencer.update()
+        if (
+            self.in_game_mode
+            and self.matcher.depth
+            and self.held_since[LEFT] is None
+            and self.held_since[RIGHT] is None
+            and ticks_diff(ticks_ms(), self.last_event) >= COMMIT_TIMEOUT_MS
+        ):
+            self.log(INFO, "No buttons pressed for a while")
+            self.check_sequence()
 
     def check_sequence(self):
         """
         Check the collected sequence against the MYSTERY_SOUNDS dictionary.
         """
-        sequence_str = "".join(self.sequence)
-        self.log("INFO", f"Checking sequence: {sequence_str}")
-        if sequence_str in MYSTERY_SOUNDS:
-            matched_file = FOLDER_PREFIX + MYSTERY_SOUNDS[sequence_str]
+        sequence_str = self.matcher.sequence()
+        self.log(INFO, "Checking sequence: %s", sequence_str)
+        sound = self.matcher.value()
+        if sound is not None:
+            matched_file = FOLDER_PREFIX + sound
             self.log(
-                "INFO",
-                f"Sequence matched: {sequence_str}, playing {matched_file}",
+                INFO,
+                "Sequence matched: %s, playing %s",
+                sequence_str,
+                matched_file,
             )
-            self.player.play_specific_file(matched_file)  # Play success sound
+            self.sequencer.add(matched_file)  # Success sound, after the beep
             self.exit_game_mode()
         else:
             self.exit_game_with_fail("Sequence not matched", sequence_str)